@@ -1,17 +1,42 @@
-from imagesc.imagesc import (
-    d3,
-    seaborn,
-    cluster,
-    fast,
-    clean,
-    plot)
-
-from imagesc.utils.savefig import savefig
-
-from imagesc.utils.adjmat_vec import (
-    vec2adjmat,
-    adjmat2vec,
-    )
+import importlib
+
+# Public functions are resolved on first access. This keeps "import imagesc" light-weight
+# because matplotlib, pandas, seaborn and d3heatmap are only loaded when a function is used.
+_lazy_imports = {
+    'd3': 'imagesc.imagesc',
+    'seaborn': 'imagesc.imagesc',
+    'cluster': 'imagesc.imagesc',
+    'fast': 'imagesc.imagesc',
+    'clean': 'imagesc.imagesc',
+    'plot': 'imagesc.imagesc',
+    'render': 'imagesc.imagesc',
+    'render_many': 'imagesc.utils.batch',
+    'HeatmapRenderer': 'imagesc.utils.renderer',
+    'animate': 'imagesc.utils.animate',
+    'normalize': 'imagesc.utils.normalize',
+    'cluster_order': 'imagesc.utils.ordering',
+    'tiles': 'imagesc.utils.tiles',
+    'savefig': 'imagesc.utils.savefig',
+    'Profiler': 'imagesc.utils.profile',
+    'vec2adjmat': 'imagesc.utils.adjmat_vec',
+    'adjmat2vec': 'imagesc.utils.adjmat_vec',
+    'AdjacencyAccumulator': 'imagesc.utils.adjmat_vec',
+    }
+
+__all__ = list(_lazy_imports.keys())
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        attr = getattr(importlib.import_module(_lazy_imports[name]), name)
+        # Cache on the package so the import is only resolved once.
+        globals()[name] = attr
+        return attr
+    raise AttributeError('module %r has no attribute %r' %(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
 
 __author__ = 'Erdogan Tasksen'
 __email__ = 'erdogant@gmail.com'
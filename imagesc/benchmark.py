@@ -0,0 +1,369 @@
+""" Benchmarks for imagesc."""
+# --------------------------------------------------------------------------
+# Name        : benchmark.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+import subprocess
+import platform
+import argparse
+import time
+import sys
+import json
+
+# Modules that should not be loaded by a plain "import imagesc".
+HEAVY_MODULES = ['matplotlib', 'pandas', 'seaborn', 'd3heatmap', 'scipy']
+# Functions and shapes of the benchmark suite.
+FUNCTIONS = ['fast', 'plot', 'clean', 'seaborn', 'cluster', 'd3', 'vec2adjmat', 'adjmat2vec']
+SIZES = [(10, 10), (100, 100), (1000, 1000), (5000, 5000), (20000, 20000)]
+# Fraction of non-zero cells in the adjacency matrices.
+DENSITY = 0.1
+
+
+# %% Import time
+def import_time(repeats=5, max_time=None, verbose=3):
+    """Measure the time of "import imagesc" in a fresh interpreter.
+
+    Parameters
+    ----------
+    repeats : int, (default: 5)
+        Number of fresh interpreters to start. The fastest run is reported.
+    max_time : float, (default: None)
+        Maximum allowed import time in seconds. A RuntimeError is raised when exceeded.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        'time' : fastest import time in seconds.
+        'loaded' : heavy modules that were loaded by the import.
+
+    Examples
+    --------
+    >>> from imagesc.benchmark import import_time
+    >>> results = import_time(max_time=0.1)
+
+    """
+    code = ('import sys, time, json\n'
+            't = time.perf_counter()\n'
+            'import imagesc\n'
+            't = time.perf_counter() - t\n'
+            'print(json.dumps({"time": t, "loaded": [m for m in %r if m in sys.modules]}))' %(HEAVY_MODULES))
+
+    results = None
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        if (results is None) or (run['time'] < results['time']):
+            results = run
+
+    if verbose>=3: print('[imagesc] >import imagesc: %.1f ms' %(results['time'] * 1000))
+    if len(results['loaded'])>0:
+        raise RuntimeError('[imagesc] >import imagesc should not load: %s' %(results['loaded']))
+    if (max_time is not None) and (results['time'] > max_time):
+        raise RuntimeError('[imagesc] >import imagesc took %.1f ms which exceeds %.1f ms' %(results['time'] * 1000, max_time * 1000))
+
+    return results
+
+
+# %% Memory leak
+def memory_leak(n=10000, kind='fast', shape=(10, 10), max_growth=50, verbose=3):
+    """Render many figures headless and check that the memory does not grow.
+
+    Parameters
+    ----------
+    n : int, (default: 10000)
+        Number of figures to render.
+    kind : String, (default: 'fast')
+        The heatmap function that is used by imagesc.render().
+    shape : tuple, (default: (10, 10))
+        Shape of the random data.
+    max_growth : float, (default: 50)
+        Maximum allowed growth of the peak memory in MB after the warm-up. A RuntimeError is raised when exceeded.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        'warmup' : peak memory in MB after the first 10% of the figures.
+        'final' : peak memory in MB after all figures.
+        'open_figures' : number of figures that remain registered by pyplot.
+
+    Examples
+    --------
+    >>> from imagesc.benchmark import memory_leak
+    >>> results = memory_leak(n=10000)
+
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+    import imagesc
+
+    warmup = None
+    data = np.random.rand(shape[0], shape[1])
+    for i in range(n):
+        imagesc.render(data, kind=kind, verbose=0)
+        if i==max(n // 10, 1) - 1:
+            warmup = _peak_memory()
+
+    results = {'warmup': warmup, 'final': _peak_memory(), 'open_figures': len(plt.get_fignums())}
+    if verbose>=3: print('[imagesc] >Peak memory after %d figures: %.1f MB (warm-up: %.1f MB)' %(n, results['final'], results['warmup']))
+    if results['open_figures']>0:
+        raise RuntimeError('[imagesc] >%d figures were not closed.' %(results['open_figures']))
+    if results['final'] - results['warmup'] > max_growth:
+        raise RuntimeError('[imagesc] >Memory grew with %.1f MB while rendering.' %(results['final'] - results['warmup']))
+
+    return results
+
+
+def _peak_memory():
+    # Peak resident memory of this process in MB.
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports in kilobytes and macOS in bytes
+    return peak / 1024**2 if sys.platform=='darwin' else peak / 1024
+
+
+# %% Benchmark suite
+def run(functions=None, sizes=None, labels=(False, True), timeout=600, filepath=None, baseline=None, tolerance=0.2, verbose=3):
+    """Measure the wall time, peak memory and output size of the heatmap functions.
+
+    Every case runs in a fresh interpreter so that the peak memory of one case is not
+    affected by the others. The data is random with a fixed seed. The heatmap functions
+    write a PNG with imagesc.render(), d3 writes the compact html, and for vec2adjmat and
+    adjmat2vec the size is the memory of the returned DataFrame. Adjacency matrices contain
+    10% non-zero cells, and vec2adjmat uses the edges of such a matrix.
+
+    Parameters
+    ----------
+    functions : list, (default: None)
+        Functions to measure. None uses all: 'fast', 'plot', 'clean', 'seaborn', 'cluster', 'd3', 'vec2adjmat', 'adjmat2vec'.
+    sizes : list of tuples, (default: None)
+        Shapes of the data. None uses (10, 10) up to (20000, 20000).
+    labels : tuple, (default: (False, True))
+        Measure without and/or with row and column labels.
+    timeout : float, (default: 600)
+        Maximum time of a single case in seconds. The error of the case is then 'timeout'.
+    filepath : String, (default: None)
+        Write the results to this JSON file.
+    baseline : String or dict, (default: None)
+        Results of a previous run, or the path to its JSON file, to compare with. See compare().
+        The timings depend on the machine, so the baseline should be created with filepath on the same machine.
+    tolerance : float, (default: 0.2)
+        Allowed relative increase of the time and memory compared to the baseline.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        'system' : versions and platform.
+        'results' : list with 'function', 'shape', 'labels', 'time' in seconds, 'peak_rss' in MB, 'size' in bytes and 'error' for each case.
+        'regressions' : cases that exceed the tolerance when a baseline is given.
+
+    Examples
+    --------
+    >>> from imagesc.benchmark import run
+    >>> results = run(functions=['fast', 'clean'], sizes=[(100, 100), (1000, 1000)], filepath='benchmark.json')
+    >>> results = run(functions=['fast', 'clean'], sizes=[(100, 100), (1000, 1000)], baseline='benchmark.json')
+
+    """
+    functions = FUNCTIONS if functions is None else functions
+    sizes = SIZES if sizes is None else sizes
+    results = {'system': _system(), 'results': []}
+    for function in functions:
+        if function not in FUNCTIONS:
+            raise ValueError('[imagesc] >function should be one of %s' %(FUNCTIONS))
+        for shape in sizes:
+            for label in labels:
+                case = {'function': function, 'shape': list(shape), 'labels': bool(label)}
+                result = _run_case(case, timeout)
+                results['results'].append(result)
+                if verbose>=3: print('[imagesc] >%s' %(_format(result)))
+
+    if baseline is not None:
+        results['regressions'] = compare(results, baseline, tolerance=tolerance, verbose=verbose)
+    if filepath is not None:
+        with open(filepath, 'w') as f:
+            json.dump(results, f, indent=1)
+        if verbose>=3: print('[imagesc] >Results are written to [%s]' %(filepath))
+    return results
+
+
+# %% Compare with baseline
+def compare(results, baseline, tolerance=0.2, verbose=3):
+    """Compare benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results : String or dict
+        Results of run(), or the path to its JSON file.
+    baseline : String or dict
+        Results of run(), or the path to its JSON file.
+    tolerance : float, (default: 0.2)
+        Allowed relative increase of the time and the peak memory.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    list
+        Cases that are slower, use more memory or fail whereas the baseline succeeded.
+
+    """
+    results, baseline = _load(results), _load(baseline)
+    reference = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        base = reference.get(_key(result))
+        if base is None or base['error'] is not None:
+            continue
+        if result['error'] is not None:
+            regressions.append({**result, 'reason': 'error'})
+            continue
+        for metric in ['time', 'peak_rss']:
+            ratio = result[metric] / base[metric] if base[metric]>0 else 1
+            if ratio > 1 + tolerance:
+                regressions.append({**result, 'reason': metric, 'ratio': ratio})
+            if verbose>=4: print('[imagesc] >%s %s: %.2fx of the baseline' %(_format(result), metric, ratio))
+
+    if verbose>=2:
+        for regression in regressions:
+            print('[imagesc] >Warning: Regression in %s: %s %s' %(regression['reason'], _format(regression), '' if 'ratio' not in regression else '(%.2fx)' %(regression['ratio'])))
+    if verbose>=3 and len(regressions)==0: print('[imagesc] >No regressions compared to the baseline.')
+    return regressions
+
+
+def _run_case(case, timeout):
+    code = 'import sys, json\nfrom imagesc.benchmark import _measure\nprint(json.dumps(_measure(json.loads(sys.argv[1]))))'
+    result = {**case, 'time': None, 'peak_rss': None, 'size': None, 'error': None}
+    try:
+        out = subprocess.run([sys.executable, '-c', code, json.dumps(case)], capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        result['error'] = 'timeout'
+        return result
+    if out.returncode!=0:
+        # The last line of the traceback contains the error
+        lines = out.stderr.strip().splitlines()
+        result['error'] = lines[-1] if len(lines)>0 else 'exit code %d' %(out.returncode)
+        return result
+    result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def _measure(case):
+    # Runs a single case. This is called in a fresh interpreter by _run_case().
+    import numpy as np
+    import pandas as pd
+    import tempfile
+    import os
+    import imagesc
+    function, shape = case['function'], tuple(case['shape'])
+    # Modules are imported before the time is measured
+    import imagesc.imagesc
+    import imagesc.utils.adjmat_vec
+    if function in ['seaborn', 'cluster']:
+        import seaborn
+
+    rng = np.random.default_rng(0)
+    row_labels = np.array(['row%d' %(i) for i in range(shape[0])]) if case['labels'] else None
+    col_labels = np.array(['col%d' %(i) for i in range(shape[1])]) if case['labels'] else None
+    data = rng.random(shape, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath = None
+        if function in ['fast', 'plot', 'clean', 'seaborn', 'cluster']:
+            filepath = os.path.join(tmpdir, 'heatmap.png')
+            call = lambda: imagesc.render(data, kind=function, filepath=filepath, row_labels=row_labels, col_labels=col_labels, verbose=0)
+        elif function=='d3':
+            filepath = os.path.join(tmpdir, 'heatmap.html')
+            df = pd.DataFrame(data, index=row_labels, columns=col_labels)
+            call = lambda: imagesc.d3(df, path=filepath, compact=True, showfig=False, cache=False, verbose=0)
+        elif function=='adjmat2vec':
+            data[data>DENSITY] = 0
+            df = pd.DataFrame(data, index=row_labels, columns=col_labels)
+            call = lambda: imagesc.adjmat2vec(df, verbose=0)
+        elif function=='vec2adjmat':
+            n = int(shape[0] * shape[1] * DENSITY)
+            source, target = rng.integers(0, shape[0], n), rng.integers(0, shape[1], n)
+            if case['labels']:
+                source, target = row_labels[source], col_labels[target]
+            call = lambda: imagesc.vec2adjmat(source, target, weight=data.ravel()[:n], symmetric=False)
+
+        start = time.perf_counter()
+        out = call()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(filepath) if filepath is not None else int(out.memory_usage(deep=True).sum())
+
+    return {'time': elapsed, 'peak_rss': _peak_memory(), 'size': size}
+
+
+def _system():
+    import numpy as np
+    import matplotlib
+    import imagesc
+    return {'imagesc': imagesc.__version__, 'python': platform.python_version(), 'numpy': np.__version__, 'matplotlib': matplotlib.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def _load(results):
+    if isinstance(results, dict):
+        return results
+    with open(results, 'r') as f:
+        return json.load(f)
+
+
+def _key(result):
+    return (result['function'], tuple(result['shape']), result['labels'])
+
+
+def _format(result):
+    name = '%s %dx%d%s' %(result['function'], result['shape'][0], result['shape'][1], ' with labels' if result['labels'] else '')
+    if result['error'] is not None:
+        return '%s: %s' %(name, result['error'])
+    return '%s: %.3f sec, %.1f MB, %d bytes' %(name, result['time'], result['peak_rss'], result['size'])
+
+
+# %% Main
+def main(argv=None):
+    """Command line interface.
+
+    Examples
+    --------
+    >>> python -m imagesc.benchmark run --functions fast clean --sizes 100x100 1000x1000 --output benchmark.json
+    >>> python -m imagesc.benchmark run --functions fast clean --sizes 100x100 1000x1000 --baseline benchmark.json
+    >>> python -m imagesc.benchmark import_time
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m imagesc.benchmark', description='Benchmarks for imagesc.')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'import_time', 'memory_leak'])
+    parser.add_argument('--functions', nargs='+', default=None, choices=FUNCTIONS)
+    parser.add_argument('--sizes', nargs='+', default=None, help='Shapes such as 100x100.')
+    parser.add_argument('--labels', default='both', choices=['both', 'on', 'off'])
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--output', default=None, help='JSON file to write the results.')
+    parser.add_argument('--baseline', default=None, help='JSON file of a previous run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--verbose', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command=='import_time':
+        import_time(verbose=args.verbose)
+    elif args.command=='memory_leak':
+        memory_leak(verbose=args.verbose)
+    else:
+        sizes = None if args.sizes is None else [tuple(int(n) for n in size.lower().split('x')) for size in args.sizes]
+        labels = {'both': (False, True), 'on': (True,), 'off': (False,)}[args.labels]
+        results = run(functions=args.functions, sizes=sizes, labels=labels, timeout=args.timeout, filepath=args.output, baseline=args.baseline, tolerance=args.tolerance, verbose=args.verbose)
+        # Exit code 1 when there are regressions
+        return 1 if len(results.get('regressions', []))>0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,22 +7,31 @@
 # --------------------------------------------------------------------------
 
 # %% Libraries
-from d3heatmap import d3heatmap
-from imagesc.utils.adjmat_vec import adjmat2vec
 from shutil import copyfile
 from packaging import version
 import webbrowser
 import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from imagesc.utils.savefig import savefig
+from imagesc.utils import reduce, raster, ticks, grid
+from imagesc.utils.normalize import normalize
+from imagesc.utils.ordering import cluster_order
+from imagesc.utils.cache import hash_key
+from imagesc.utils.profile import profiled, stage
 import pandas as pd
 import numpy as np
 import tempfile
+import time
+import io
 import os
 curpath = os.path.dirname(os.path.abspath(__file__))
 
 
 # %%
-def d3(df, clust=None, path=None, title='Co-occurrence heatmap', description=None, scale=True, vmin=None, vmax=None, width=720, height=720, showfig=True, stroke='red', verbose=3):
+@profiled
+def d3(df, clust=None, path=None, title='Co-occurrence heatmap', description=None, scale=True, vmin=None, vmax=None, width=720, height=720, showfig=True, stroke='red', compact=False, cmap='coolwarm', dtype='uint8', payload='base64', max_cells=None, cache=False, cache_dir=None, cache_size=100 * 1024**2, verbose=3):
     """Heatmap in d3 javascript.
 
     Parameters
@@ -37,6 +46,10 @@ def d3(df, clust=None, path=None, title='Co-occurrence heatmap', description=Non
         Title text.
     description : String, (default: 'Heatmap description')
         Description text of the heatmap.
+    scale : Bool, (default: True)
+        Not supported. A warning is shown when set to False.
+    vmin : float, (default: None)
+        Minimum of the color range. Only used in the compact mode.
     vmax : Bool, (default: 100).
         Range of colors starting with maximum value.
             * 100 : cells above value >100 are capped.
@@ -51,6 +64,25 @@ def d3(df, clust=None, path=None, title='Co-occurrence heatmap', description=Non
             * 'black'
     showfig : Bool, (default: True)
         Open browser with heatmap.
+    compact : Bool, (default: False)
+        Store the values as a quantized binary array that is drawn on a canvas, instead of a JSON object per cell.
+        This keeps the html small for large data. The parameters below are only used in the compact mode, and clust is not supported.
+    cmap : String, (default: 'coolwarm')
+        Name of the matplotlib colormap.
+    dtype : String, (default: 'uint8')
+        Quantization of the values: 'uint8' or 'uint16'.
+    payload : String, (default: 'base64')
+        'base64' embeds the values in the html. 'file' writes the values to a .bin file next to the html, which requires the html to be served over http.
+    max_cells : int, (default: None)
+        Data with more cells is reduced to this number of cells by averaging blocks of cells.
+    cache : Bool, (default: False)
+        Reuse the html of a heatmap that was created before with the same data and parameters.
+        The html is then copied to path when it differs, and is not created again.
+        Note that with path=None, the html is then written to the cache_dir.
+    cache_dir : String, (default: None)
+        Directory of the cached html files. None uses the imagesc_d3 directory in the user temp directory.
+    cache_size : int, (default: 100MB)
+        Maximum size of the cache directory in bytes. The least recently used heatmaps are removed, except for the heatmap that is just created.
     verbose : int [0-5], (default: 3)
         Verbosity to print the working-status. The higher the number, the more information.
             * 0: None
@@ -71,32 +103,96 @@ def d3(df, clust=None, path=None, title='Co-occurrence heatmap', description=Non
     >>> Example: Heatmap in d3js
     >>> df = pd.DataFrame(np.random.randint(0, 100, size=(50, 50)))
     >>> imagesc.d3(df, vmax=1)
+    >>>
+    >>> Example: Large data
+    >>> df = pd.DataFrame(np.random.rand(2000, 2000))
+    >>> imagesc.d3(df, compact=True, max_cells=250000)
 
     Returns
     -------
     out : dict.
-        output path names.
+        output path names, the filesize in bytes and the generation time in seconds.
 
     """
-    results = d3heatmap.heatmap(df, clust=clust, path=path, title=title, description=description, vmax=vmax, width=width, height=height, showfig=showfig, stroke=stroke, verbose=verbose)
+    from imagesc.utils import d3export
+    start = time.time()
+    # Arguments that are not supported are not silently dropped
+    if compact and clust is not None:
+        if verbose>=2: print('[imagesc] >WARNING: clust is not supported with compact=True and is ignored.')
+    if not compact and vmin is not None:
+        if verbose>=2: print('[imagesc] >WARNING: vmin is only supported with compact=True and is ignored.')
+    if not scale:
+        if verbose>=2: print('[imagesc] >WARNING: scale is not supported and is ignored.')
+    if cache:
+        if cache_dir is None: cache_dir = d3export.CACHE_DIR
+        if path is not None: _, _, path = _path_check(path, verbose)
+        key = hash_key(np.asarray(df.values), np.asarray(df.index.astype(str), dtype=str), np.asarray(df.columns.astype(str), dtype=str), clust,
+                       title, description, scale, vmin, vmax, width, height, stroke, compact, cmap, dtype, payload, max_cells)
+        results = d3export.cache_get(key, cache_dir, path=path)
+        if results is not None:
+            if verbose>=3: print('[imagesc] >Heatmap is retrieved from cache: [%s]' %(results['path']))
+            results['time'] = time.time() - start
+            if showfig: webbrowser.open(results['path'], new=1)
+            return results
+        # Create the heatmap in the cache directory
+        target, path = path, d3export.cache_path(key, cache_dir)
+
+    if compact:
+        _, _, path = _path_check(path, verbose)
+        results = d3export.heatmap(df, path, title=title, description=description, vmin=vmin, vmax=vmax, width=width, height=height, cmap=cmap, dtype=dtype, payload=payload, max_cells=max_cells, showfig=showfig and not cache, stroke=stroke, verbose=verbose)
+    else:
+        from d3heatmap import d3heatmap
+        results = d3heatmap.heatmap(df, clust=clust, path=path, title=title, description=description, vmax=vmax, width=width, height=height, showfig=showfig and not cache, stroke=stroke, verbose=verbose)
+        results['filesize'] = os.path.getsize(results['path'])
+        results['time'] = time.time() - start
+
+    if cache:
+        results = d3export.cache_put(key, cache_dir, results, path=target, max_bytes=cache_size)
+        if showfig: webbrowser.open(results['path'], new=1)
     # Return
     return results
 
 
 # %%
+@profiled
 def plot(data, row_labels=None, col_labels=None, **args):
     """Heatmap plot.
 
     Parameters
     ----------
-    data : numpy array
-        data array.
+    data : array-like
+        data array. np.memmap, path to a .npy file and chunked arrays (h5py, zarr) are read in bands of rows.
+        scipy.sparse matrices, such as adjacency matrices, are reduced from the non-zero entries without creating the dense matrix.
     row_labels : List
         A list or array of length N with the labels for the rows.
     col_labels : List
         A list or array of length M with the labels for the columns.
     **args
         Various functionalities that can are directly used as input for seaborn.
+    normalize : Bool or String, (default: False)
+        Normalize the data, see imagesc.normalize() for the methods. True is equal to 'global'.
+    show : Bool, (default: True)
+        Show the figure. When False, the figure is created without pyplot and is not kept in memory by pyplot.
+    bad, over, under : color, (default: None)
+        Color of missing values, of values above vmax and of values below vmin. None uses the colors of the colormap.
+    lut_size : int, (default: None)
+        Number of colors of the colormap, such as 256 or 4096. None uses the colormap as is.
+    label_thinning : Bool, (default: True)
+        Only show the tick labels that fit on the axes, based on the font size and the length of the labels.
+    pinned_labels : list, (default: None)
+        Row and column labels that are always shown when the tick labels are thinned.
+    reduce : String, (default: 'mean')
+        Data that is larger than the pixel grid of the figure (figsize * dpi) is reduced by aggregating blocks of cells.
+        The row and column labels of the first cell in each block are kept. Square blocks are used to keep the
+        aspect ratio, and the axes and ticks remain in the coordinates of the original data.
+            * 'mean'
+            * 'max'
+            * 'min'
+            * None : No reduction.
+    annot : Bool, (default: False)
+        Write the value in each cell. All cells are drawn by a single artist.
+    annot_kws : dict, (default: None)
+        Arguments for the annotation, such as valfmt ("{x:.2f}"), textcolors, threshold, fontsize and min_pixels.
 
     Examples
     --------
@@ -120,30 +216,41 @@ def plot(data, row_labels=None, col_labels=None, **args):
     assert not isinstance(data, pd.DataFrame), print('[imagesc] >data input must be numpy array')
     # Set defaults
     args, args_im = _defaults(args)
+    # Memory-map .npy files
+    with stage('load'):
+        data = reduce.load(data)
     # Set figsize based on data shape
     args_im['figsize'] = _set_figsize(data.shape, args_im['figsize'])
+    # Statistics for normalization are computed on the full data
+    stats = _stats(data, args_im)
+    # Reduce to the pixel grid of the figure
+    source = data
+    data, row_labels, col_labels = _reduce(data, row_labels, col_labels, args_im, square=True)
     # Linewidth if required
     args['linewidth'] = _check_input(data, args['linewidth'], args_im)
     # Normalize
-    data = _normalize(data, args_im)
+    data = _normalize(data, args_im, stats=stats, source=source)
     # Make plot
-    fig, ax = plt.subplots(figsize=args_im['figsize'])
+    fig, ax = _subplots(args_im)
     # Make the heatmap
-    _ = _heatmap(data, row_labels, col_labels, args_im, **args)
+    im = _heatmap(data, row_labels, col_labels, args_im, ax=ax, **args)
     # Add text into the cells
-    # _  = _annotate_heatmap(im, valfmt="{x:.1f} t")
+    if args['annot']:
+        _ = _annotate_heatmap(im, **args.get('annot_kws', {}))
     ax.set_xlabel(args_im['xlabel'])
     ax.set_ylabel(args_im['ylabel'])
     if args_im['title'] is not None:
         ax.set_title(args_im['title'])
 
-    fig.tight_layout()
-    plt.show()
+    with stage('tight_layout'):
+        fig.tight_layout()
+    if args_im['show']: plt.show()
 
     # return
     return fig, ax
 
 # %% Seaborn
+@profiled
 def seaborn(data, row_labels=None, col_labels=None, **args):
     """Heatmap based on seaborn.
 
@@ -158,6 +265,18 @@ def seaborn(data, row_labels=None, col_labels=None, **args):
     **args : TYPE
         Various functionalities that can are directly used as input for seaborn.
         https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.axes.Axes.pcolor.html
+    normalize : Bool or String, (default: False)
+        Normalize the data, see imagesc.normalize() for the methods. True is equal to 'global'.
+    show : Bool, (default: True)
+        Show the figure. When False, the figure is created without pyplot and is not kept in memory by pyplot.
+    bad, over, under : color, (default: None)
+        Color of missing values, of values above vmax and of values below vmin. None uses the colors of the colormap.
+    lut_size : int, (default: None)
+        Number of colors of the colormap, such as 256 or 4096. None uses the colormap as is.
+    label_thinning : Bool, (default: True)
+        Only show the tick labels that fit on the axes, based on the font size and the length of the labels.
+    pinned_labels : list, (default: None)
+        Row and column labels that are always shown when the tick labels are thinned.
 
     Examples
     --------
@@ -208,9 +327,14 @@ def seaborn(data, row_labels=None, col_labels=None, **args):
     # sns.set_style({"savefig.dpi": args_im['dpi']})
     # Set figsize based on data shape
     # args_im['figsize']=_set_figsize(data.shape, args_im['figsize'])
-    [fig, ax] = plt.subplots(figsize=args_im['figsize'])
+    [fig, ax] = _subplots(args_im)
+    # The tick labels are set once after the heatmap, unless they are set by the user
+    labels = ('xticklabels' not in args) and ('yticklabels' not in args)
+    if labels:
+        args['xticklabels'], args['yticklabels'] = False, False
     # Make heatmap
-    ax = sns.heatmap(df, **args)
+    with stage('heatmap'):
+        ax = sns.heatmap(df, ax=ax, **args)
     # Set labels
     ax.set_xlabel(args_im['xlabel'])
     ax.set_ylabel(args_im['ylabel'])
@@ -219,9 +343,11 @@ def seaborn(data, row_labels=None, col_labels=None, **args):
     if args_im['label_orientation'] == 'above':
         ax.xaxis.tick_top()
 
-    # Rotate labels
-    ax.set_xticklabels(col_labels, rotation=args_im['xtickRot'], ha='center', minor=False)
-    ax.set_yticklabels(row_labels, rotation=args_im['ytickRot'], ha='right', minor=False)
+    # Labels at the centers of the cells that fit on the axes
+    if labels:
+        with stage('ticks'):
+            ticks.set_ticks(ax, 'x', col_labels, args_im, offset=0.5, ha='center')
+            ticks.set_ticks(ax, 'y', row_labels, args_im, offset=0.5, ha='right')
     # set the x-axis labels on the top
     
     # # fix for mpl bug that cuts off top/bottom of seaborn viz
@@ -232,12 +358,13 @@ def seaborn(data, row_labels=None, col_labels=None, **args):
     
     # Plot
     # ax.tight_layout()
-    plt.show()
+    if args_im['show']: plt.show()
     # Return
     fig = ax.get_figure()
     return fig, ax
 
 # %% Cluster
+@profiled
 def cluster(data, row_labels=None, col_labels=None, **args):
     """Clustering of the Heatmap based on seaborn.
 
@@ -253,6 +380,20 @@ def cluster(data, row_labels=None, col_labels=None, **args):
     **args : TYPE
         Various functionalities that can are directly used as input for seaborn.
         https://seaborn.pydata.org/generated/seaborn.clustermap.html
+    normalize : Bool or String, (default: False)
+        Normalize the data, see imagesc.normalize() for the methods. True is equal to 'global'.
+    show : Bool, (default: True)
+        Show the figure. Note that seaborn always creates the clustermap with pyplot.
+    cluster_method : String, (default: 'auto')
+        Clustering method: 'auto', 'exact', 'vector' or 'sample'. See imagesc.cluster_order() for details.
+    optimal_ordering : Bool, (default: False)
+        Reorder the leaves such that the distance between successive leaves is minimal.
+    order : dict, (default: None)
+        Orderings from imagesc.cluster_order() to reuse. The clustering is then skipped.
+    cache : Bool, (default: True)
+        Reuse the orderings when the same data is clustered again with the same distance, linkage and standard_scale.
+    cache_dir : String, (default: None)
+        Directory to store the cached orderings on disk.
 
     Examples
     --------
@@ -265,6 +406,10 @@ def cluster(data, row_labels=None, col_labels=None, **args):
     >>>
     >>> # Example: Clustering
     >>> fig = imagesc.cluster(df.values, df.index.values, df.columns.values)
+    >>>
+    >>> # Example: Reuse the orderings
+    >>> order = imagesc.cluster_order(df.values)
+    >>> fig = imagesc.cluster(df.values, df.index.values, df.columns.values, order=order, cmap='rainbow')
 
     Returns
     -------
@@ -283,19 +428,32 @@ def cluster(data, row_labels=None, col_labels=None, **args):
     # Linewidth if required
     args['linewidth'] = _check_input(data, args['linewidth'], args_im)
     # Normalize
-    data = _normalize(data, args_im)
+    source = data
+    data = _normalize(data, args_im, source=source)
+    # Scale rows (0) or columns (1) between [0, 1] similar to seaborn
+    if args['standard_scale'] is not None:
+        data = normalize(data, method=['row', 'column'][args['standard_scale']], inplace=_owns(data, source))
+
+    # Order rows and columns
+    order = args_im['order']
+    if order is None:
+        order = cluster_order(data, linkage=args['linkage'], distance=args['distance'], method=args_im['cluster_method'], optimal_ordering=args_im['optimal_ordering'], cache=args_im['cache'], cache_dir=args_im['cache_dir'], verbose=args_im['verbose'])
 
     # Set row and col labels
     row_labels, col_labels = set_labels(data.shape, row_labels, col_labels)
     # Make dataframe
     df = pd.DataFrame(data=data, index=row_labels, columns=col_labels)
+    # Without linkage (sample method), the ordering is applied to the data and no dendrogram is shown.
+    if order['row_linkage'] is None: df = df.iloc[order['row'], :]
+    if order['col_linkage'] is None: df = df.iloc[:, order['col']]
     sns.set(color_codes=True)
     sns.set(font_scale=1.2)
     sns.set_style({"savefig.dpi": args_im['dpi']})
     # Set figsize based on data shape
     # args_im['figsize']=_set_figsize(data.shape, args_im['figsize'])
     # Make heatmap
-    g = sns.clustermap(df, method=args['linkage'], metric=args['distance'], col_cluster=True, row_cluster=True, linecolor=args['linecolor'], linewidths=args['linewidth'], cmap=args['cmap'], standard_scale=args['standard_scale'], vmin=args['vmin'], vmax=args['vmax'], figsize=args_im['figsize'])
+    with stage('clustermap'):
+        g = sns.clustermap(df, row_linkage=order['row_linkage'], col_linkage=order['col_linkage'], col_cluster=order['col_linkage'] is not None, row_cluster=order['row_linkage'] is not None, linecolor=args['linecolor'], linewidths=args['linewidth'], cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'], figsize=args_im['figsize'])
     # Rotate labels
     plt.setp(g.ax_heatmap.get_xticklabels(), rotation=args_im['xtickRot'], ha='center')
     plt.setp(g.ax_heatmap.get_yticklabels(), rotation=args_im['ytickRot'], ha='left')
@@ -308,19 +466,21 @@ def cluster(data, row_labels=None, col_labels=None, **args):
     # plt.rc('axes', labelsize=14)    # fontsize of the x and y labels
 
     # Plot
-    plt.show()
+    if args_im['show']: plt.show()
     # Return
     return g.fig
 
 
 # %% Clean
+@profiled
 def clean(data, row_labels=None, col_labels=None, **args):
     """Clean heatmap figure.
 
     Parameters
     ----------
-    data : numpy array
-        data array.
+    data : array-like
+        data array. np.memmap, path to a .npy file and chunked arrays (h5py, zarr) are read in bands of rows.
+        scipy.sparse matrices, such as adjacency matrices, are reduced from the non-zero entries without creating the dense matrix.
     row_labels
         A list or array of length N with the labels for the rows.
     col_labels
@@ -328,6 +488,25 @@ def clean(data, row_labels=None, col_labels=None, **args):
     **args : TYPE
         Various functionalities that can are directly used as input for seaborn.
         cmap, vmin, vmax, normalize
+    normalize : Bool or String, (default: False)
+        Normalize the data, see imagesc.normalize() for the methods. True is equal to 'global'.
+    show : Bool, (default: True)
+        Show the figure. When False, the figure is created without pyplot and is not kept in memory by pyplot.
+    bad, over, under : color, (default: None)
+        Color of missing values, of values above vmax and of values below vmin. None uses the colors of the colormap.
+    lut_size : int, (default: None)
+        Number of colors of the colormap, such as 256 or 4096. None uses the colormap as is.
+    raster : Bool, (default: False)
+        Skip matplotlib and convert the data directly into PNG with one pixel per cell.
+    filepath : String, (default: None)
+        Write the PNG to this path. Only used in combination with raster=True.
+    reduce : String, (default: 'mean')
+        Data that is larger than the pixel grid of the figure (figsize * dpi) is reduced by aggregating blocks of cells.
+        With raster=True, the data is only reduced when reduce is given, and square blocks are used to keep the aspect ratio.
+            * 'mean'
+            * 'max'
+            * 'min'
+            * None : No reduction.
 
     Examples
     --------
@@ -339,31 +518,52 @@ def clean(data, row_labels=None, col_labels=None, **args):
     >>>
     >>> # Example: When no borders are grid is required.
     >>> fig, ax = imagesc.clean(df.values, df.index.values, df.columns.values)
+    >>>
+    >>> # Example: Write PNG directly without matplotlib.
+    >>> png = imagesc.clean(df.values, raster=True, filepath='heatmap.png')
 
     Returns
     -------
     fig.
-
+        The PNG content in bytes when raster=True.
 
     """
     assert not isinstance(data, pd.DataFrame), print('[imagesc] >data input must be numpy array')
+    # The raster path writes one pixel per cell, unless reduce is given
+    raster_reduce = args.get('reduce', None)
     # Set defaults
     args, args_im = _defaults(args)
+    if args_im['raster']: args_im['reduce'] = raster_reduce
+    # Memory-map .npy files
+    with stage('load'):
+        data = reduce.load(data)
+    # Set figsize based on data shape
+    args_im['figsize'] = _set_figsize(data.shape, args_im['figsize'])
+    # Statistics for normalization are computed on the full data
+    stats = _stats(data, args_im)
+    # Reduce to the pixel grid of the figure
+    source = data
+    data, row_labels, col_labels = _reduce(data, row_labels, col_labels, args_im, square=args_im['raster'])
     # Linewidth if required
     # args['linewidth']=_check_input(data, args['linewidth'], args_im)
     # Normalize
-    data = _normalize(data, args_im)
+    data = _normalize(data, args_im, stats=stats, source=source)
+    # Direct to PNG
+    if args_im['raster']:
+        with stage('to_rgba'):
+            rgba = raster.to_rgba(data, cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'])
+        with stage('to_png'):
+            return raster.to_png(rgba, filepath=args_im['filepath'])
     # Plot
-    # Set figsize based on data shape
-    args_im['figsize'] = _set_figsize(data.shape, args_im['figsize'])
-    fig, ax = plt.subplots(figsize=args_im['figsize'])
+    fig, ax = _subplots(args_im)
     # Make the plot
-    ax.pcolorfast(np.flipud(data), cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'], alpha=1)
+    with stage('pcolorfast'):
+        ax.pcolorfast(np.flipud(data), cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'], alpha=1)
     # Hide grid lines
     # if args_im['grid']==False:
     ax.grid(False)
     # if args_im['axis']==False:
-    plt.axis('off')
+    ax.axis('off')
     # Hide grid lines
     # plt.axis('off')
     # ax.grid(False)
@@ -373,19 +573,22 @@ def clean(data, row_labels=None, col_labels=None, **args):
     ax.set_xlabel(args_im['xlabel'])
     ax.set_ylabel(args_im['ylabel'])
 
-    fig.tight_layout()
-    plt.show()
+    with stage('tight_layout'):
+        fig.tight_layout()
+    if args_im['show']: plt.show()
     # Return
     return fig, ax
 
 # %% Fast
+@profiled
 def fast(data, row_labels=None, col_labels=None, **args):
     """Fast manner to create a Heatmap.
 
     Parameters
     ----------
-    data : numpy array
-        data array.
+    data : array-like
+        data array. np.memmap, path to a .npy file and chunked arrays (h5py, zarr) are read in bands of rows.
+        scipy.sparse matrices, such as adjacency matrices, are reduced from the non-zero entries without creating the dense matrix.
     row_labels
         A list or array of length N with the labels for the rows.
     col_labels
@@ -393,6 +596,29 @@ def fast(data, row_labels=None, col_labels=None, **args):
     **args : TYPE
         Various functionalities that can are directly used as input for seaborn.
         cmap, vmin, vmax, normalize
+    normalize : Bool or String, (default: False)
+        Normalize the data, see imagesc.normalize() for the methods. True is equal to 'global'.
+    show : Bool, (default: True)
+        Show the figure. When False, the figure is created without pyplot and is not kept in memory by pyplot.
+    bad, over, under : color, (default: None)
+        Color of missing values, of values above vmax and of values below vmin. None uses the colors of the colormap.
+    lut_size : int, (default: None)
+        Number of colors of the colormap, such as 256 or 4096. None uses the colormap as is.
+    label_thinning : Bool, (default: True)
+        Only show the tick labels that fit on the axes, based on the font size and the length of the labels.
+    pinned_labels : list, (default: None)
+        Row and column labels that are always shown when the tick labels are thinned.
+    reduce : String, (default: 'mean')
+        Data that is larger than the pixel grid of the figure (figsize * dpi) is reduced by aggregating blocks of cells.
+        The row and column labels of the first cell in each block are kept.
+            * 'mean'
+            * 'max'
+            * 'min'
+            * None : No reduction.
+    annot : Bool, (default: False)
+        Write the value in each cell. All cells are drawn by a single artist.
+    annot_kws : dict, (default: None)
+        Arguments for the annotation, such as valfmt ("{x:.2f}"), textcolors, threshold, fontsize and min_pixels.
 
     Examples
     --------
@@ -415,55 +641,66 @@ def fast(data, row_labels=None, col_labels=None, **args):
     assert not isinstance(data, pd.DataFrame), print('[imagesc] >data input must be numpy array')
     # Set defaults
     args, args_im = _defaults(args)
+    # Memory-map .npy files
+    with stage('load'):
+        data = reduce.load(data)
+    # Statistics for normalization are computed on the full data
+    stats = _stats(data, args_im)
+    # Reduce to the pixel grid of the figure
+    source = data
+    data, row_labels, col_labels = _reduce(data, row_labels, col_labels, args_im)
     # Linewidth if required
     args['linewidth'] = _check_input(data, args['linewidth'], args_im)
     # Normalize
-    data = _normalize(data, args_im)
+    data = _normalize(data, args_im, stats=stats, source=source)
     # Plot
     # Set figsize based on data shape
     # args_im['figsize']=_set_figsize(data.shape, args_im['figsize'])
-    fig, ax = plt.subplots(figsize=args_im['figsize'])
+    fig, ax = _subplots(args_im)
 
-    # print(args_im['figsize'])
     # Make the real plot
-    im = ax.pcolorfast(np.flipud(data), cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'], alpha=1)
+    im = _fast_layout(ax, data, row_labels, col_labels, args, args_im)
+    # Add text into the cells
+    if args['annot']:
+        _ = _annotate_heatmap(im, **args.get('annot_kws', {}))
+
+    # Return
+    return fig, ax
 
+# %% Layout of the fast heatmap
+@profiled
+def _fast_layout(ax, data, row_labels, col_labels, args, args_im):
+    # Make the real plot
+    with stage('pcolorfast'):
+        im = ax.pcolorfast(np.flipud(data), cmap=args['cmap'], vmin=args['vmin'], vmax=args['vmax'], alpha=1)
     # Create colorbar
     if args['cbar']:
-        ax.figure.colorbar(im, ax=ax)
+        with stage('colorbar'):
+            ax.figure.colorbar(im, ax=ax)
         # cbar.ax.set_ylabel(cbarlabel='', rotation=-90, va="bottom")
-    # Show all ticks and label with the respective list entries.
-    if col_labels is not None:
-        ax.set_xticks(np.arange(data.shape[1]))
-        ax.set_xticklabels(col_labels)
-        # Let the horizontal axes labeling appear on top.
-        if args_im['label_orientation'] == 'above':
-            ax.tick_params(top=True, bottom=True, labeltop=True, labelbottom=False)
-        if args_im['label_orientation'] == 'below':
-            ax.tick_params(top=True, bottom=True, labeltop=False, labelbottom=True)
-        # Rotate the tick labels and set their alignment.
-        plt.setp(ax.get_xticklabels(), rotation=args_im['xtickRot'], ha="center", rotation_mode="anchor")
-
-    # Rotate labels
-    # ax.set_xticklabels(col_labels, rotation=args_im['xtickRot'], ha='center', minor=False)
-    # ax.set_yticklabels(row_labels, rotation=args_im['ytickRot'], ha='right', minor=False)
-
-    if row_labels is not None:
-        ax.set_yticks(np.arange(data.shape[0]))
-        ax.set_yticklabels(row_labels)
-        plt.setp(ax.get_yticklabels(), rotation=args_im['ytickRot'], ha="right", rotation_mode="anchor")
+    with stage('ticks'):
+        # Show the ticks that fit on the axes and label with the respective list entries.
+        if col_labels is not None:
+            ticks.set_ticks(ax, 'x', col_labels, args_im, ha="center", rotation_mode="anchor")
+            # Let the horizontal axes labeling appear on top.
+            if args_im['label_orientation'] == 'above':
+                ax.tick_params(top=True, bottom=True, labeltop=True, labelbottom=False)
+            if args_im['label_orientation'] == 'below':
+                ax.tick_params(top=True, bottom=True, labeltop=False, labelbottom=True)
+
+        if row_labels is not None:
+            ticks.set_ticks(ax, 'y', row_labels, args_im, ha="right", rotation_mode="anchor")
 
     # Turn spines off and create white grid.
     # for edge, spine in ax.spines.items():
     #     spine.set_visible(False)
 
-    if args_im['grid']:
-        ax.set_xticks(np.arange(data.shape[1]+1)-.5, minor=True)
-        ax.set_yticks(np.arange(data.shape[0]+1)-.5, minor=True)
-    if args['linewidth']>0 and args_im['grid']:
-        ax.grid(which="minor", color=args['linecolor'], linestyle='-', linewidth=args['linewidth'])
+    with stage('grid'):
+        # All cell borders are drawn by a single artist. The cells of pcolorfast start at 0.
+        if args['linewidth']>0 and args_im['grid']:
+            grid.gridlines(ax, data.shape, offset=0, color=args['linecolor'], linewidth=args['linewidth'])
     if not args_im['axis']:
-        plt.axis('off')
+        ax.axis('off')
     ax.grid(False)
 
     # Set labels
@@ -472,11 +709,83 @@ def fast(data, row_labels=None, col_labels=None, **args):
     if args_im['title'] is not None:
         ax.set_title(args_im['title'])
 
-    # Return
-    return fig, ax
+    return im
+
+
+# %% Render
+@profiled
+def render(data, kind='fast', filepath=None, row_labels=None, col_labels=None, **args):
+    """Render a heatmap without showing it and save it to disk.
+
+    The figure is drawn on the Agg canvas without pyplot state and is always closed
+    after saving. This makes it suitable for batch processing and long-running services.
+
+    Parameters
+    ----------
+    data : numpy array
+        data array.
+    kind : String, (default: 'fast')
+        The heatmap function that is used.
+            * 'fast'
+            * 'plot'
+            * 'clean'
+            * 'seaborn'
+            * 'cluster'
+    filepath : String, (default: None)
+        Path to write the figure to, such as 'c://temp/heatmap.png'. The extension sets the file format.
+        None returns the PNG content in bytes.
+    row_labels
+        A list or array of length N with the labels for the rows.
+    col_labels
+        A list or array of length M with the labels for the columns.
+    **args
+        Arguments that are passed to the heatmap function.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> filepath = imagesc.render(np.random.rand(10, 20), kind='fast', filepath='heatmap.png')
+    >>> png = imagesc.render(np.random.rand(10, 20), kind='plot')
+
+    Returns
+    -------
+    String or bytes.
+        filepath or the PNG content in bytes when filepath is None.
+
+    """
+    funcs = {'fast': fast, 'plot': plot, 'clean': clean, 'seaborn': seaborn, 'cluster': cluster}
+    if kind not in funcs:
+        raise ValueError('[imagesc] >kind should be one of %s' %(list(funcs.keys())))
+
+    args['show'] = False
+    dpi = args.get('dpi', 100)
+    # The raster path of clean directly returns the PNG content
+    if kind=='clean' and args.get('raster', False):
+        args['filepath'] = filepath
+        png = clean(data, row_labels, col_labels, **args)
+        return png if filepath is None else filepath
+
+    fig = None
+    try:
+        fig = funcs[kind](data, row_labels, col_labels, **args)
+        if isinstance(fig, tuple): fig = fig[0]
+        if filepath is None:
+            buffer = io.BytesIO()
+            with stage('savefig'):
+                fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            return buffer.getvalue()
+        savefig(fig, filepath, dpi=dpi, verbose=args.get('verbose', 3))
+        return filepath
+    finally:
+        # Figures of seaborn.clustermap are registered by pyplot and must be closed explicitly.
+        if fig is not None:
+            plt.close(fig)
+
 
 # %%
-def _heatmap(data, row_labels, col_labels, args_im, **args):
+@profiled
+def _heatmap(data, row_labels, col_labels, args_im, ax=None, **args):
     """
     Create a heatmap from a numpy array and two lists of labels.
 
@@ -520,15 +829,24 @@ def _heatmap(data, row_labels, col_labels, args_im, **args):
     except:
         pass
 
-    ax=None
     # cbar_kw={}
     # cbarlabel=""
 
     if not ax:
         ax = plt.gca()
 
+    # Reduced data is drawn in the coordinates of the original data
+    block = args_im.get('block', (1, 1))
+    if block!=(1, 1):
+        args['extent'] = (-0.5, data.shape[1] * block[1] - 0.5, data.shape[0] * block[0] - 0.5, -0.5)
+
     # Plot the heatmap
-    im = ax.imshow(data, **args)
+    with stage('imshow'):
+        im = ax.imshow(data, **args)
+    if block!=(1, 1):
+        # Blocks at the edges can extend beyond the data
+        ax.set_xlim(-0.5, args_im['shape'][1] - 0.5)
+        ax.set_ylim(args_im['shape'][0] - 0.5, -0.5)
 
     # Create colorbar
     if args_im['cbar']:
@@ -539,39 +857,32 @@ def _heatmap(data, row_labels, col_labels, args_im, **args):
         from mpl_toolkits.axes_grid1 import make_axes_locatable
         divider = make_axes_locatable(ax)
         cax = divider.append_axes("right", size="5%", pad=0.05)
-        cbar = plt.colorbar(im, cax=cax)
-
-    # We want to show all ticks...
-    if col_labels is not None:
-        ax.set_xticks(np.arange(data.shape[1]))
-        ax.set_xticklabels(col_labels)
-        # Let the horizontal axes labeling appear on top.
-        if args_im['label_orientation']=='above':
-            ax.tick_params(top=True, bottom=True, labeltop=True, labelbottom=False)
-        if args_im['label_orientation']=='below':
-            ax.tick_params(top=True, bottom=True, labeltop=False, labelbottom=True)
-        # Rotate the tick labels and set their alignment.
-        # plt.setp(ax.get_xticklabels(), rotation=args_im['xtickRot'], ha="right", rotation_mode="anchor")
-        ax.set_xticklabels(col_labels, rotation=args_im['xtickRot'], ha='center', minor=False)
-
-    if row_labels is not None:
-        ax.set_yticks(np.arange(data.shape[0]))
-        ax.set_yticklabels(row_labels)
-        ax.set_yticklabels(row_labels, rotation=args_im['ytickRot'], ha='right', minor=False)
+        with stage('colorbar'):
+            cbar = ax.figure.colorbar(im, cax=cax)
+
+    with stage('ticks'):
+        # We want to show the ticks that fit on the axes...
+        if col_labels is not None:
+            ticks.set_ticks(ax, 'x', col_labels, args_im, step=block[1], ha='center')
+            # Let the horizontal axes labeling appear on top.
+            if args_im['label_orientation']=='above':
+                ax.tick_params(top=True, bottom=True, labeltop=True, labelbottom=False)
+            if args_im['label_orientation']=='below':
+                ax.tick_params(top=True, bottom=True, labeltop=False, labelbottom=True)
+
+        if row_labels is not None:
+            ticks.set_ticks(ax, 'y', row_labels, args_im, step=block[0], ha='right')
 
     # Turn spines off and create white grid.
     # for edge, spine in ax.spines.items():
     #     spine.set_visible(False)
 
-    if args_im['grid']:
-        # if not col_labels is None:
-        ax.set_xticks(np.arange(data.shape[1] + 1) - .5, minor=True)
-        # if not row_labels is None:
-        ax.set_yticks(np.arange(data.shape[0] + 1) - .5, minor=True)
-    if args_im['linewidth']>0 and args_im['grid']:
-        ax.grid(which="minor", color=args_im['linecolor'], linestyle='-', linewidth=args_im['linewidth'])
+    with stage('grid'):
+        # All cell borders are drawn by a single artist
+        if args_im['linewidth']>0 and args_im['grid']:
+            grid.gridlines(ax, data.shape, block=block, color=args_im['linecolor'], linewidth=args_im['linewidth'])
     if args_im['axis'] is False:
-        plt.axis('off')
+        ax.axis('off')
     # Grid
     ax.grid(False)
 
@@ -579,13 +890,14 @@ def _heatmap(data, row_labels, col_labels, args_im, **args):
 
 
 # %% Set defaults
+@profiled
 def _defaults(args):
     # Version check
     if not version.parse(matplotlib.__version__) > version.parse("3.1.1"):
         print('[imagesc] >Warning: Matplotlib version is advised to be to be > v3.1.1. Otherwise heatmaps can have cut-off tops and bottoms.\nTry to: pip install -U matplotlib')
 
     # Extract the below for internal stuff
-    getdefaults={'xlabel':None,'ylabel':None,'title':None,'axis':True,'grid':True,'normalize':False,'label_orientation':'below','verbose':3,'xtickRot':90,'ytickRot':0,'dpi':100,'figsize':(15,5)}
+    getdefaults={'xlabel':None,'ylabel':None,'title':None,'axis':True,'grid':True,'normalize':False,'label_orientation':'below','verbose':3,'xtickRot':90,'ytickRot':0,'dpi':100,'figsize':(15,5),'raster':False,'filepath':None,'show':True,'reduce':'mean','cluster_method':'auto','optimal_ordering':False,'order':None,'cache':True,'cache_dir':None,'bad':None,'over':None,'under':None,'lut_size':None,'label_thinning':True,'pinned_labels':None}
     args_im=dict()
     for getdefault in getdefaults:
         args_im.setdefault(getdefault, args.get(getdefault,getdefaults.get(getdefault)))
@@ -605,27 +917,83 @@ def _defaults(args):
     args.setdefault('vmax',None)
     args.setdefault('distance','euclidean')
     args.setdefault('linkage','ward')
+    # The colormap is resolved once and shared by all heatmap functions
+    args['cmap'] = raster.colormap(args['cmap'], N=args_im['lut_size'], bad=args_im['bad'], over=args_im['over'], under=args_im['under'])
     # Return
     return(args, args_im)
 
+# %% Create figure
+@profiled
+def _subplots(args_im):
+    # Pyplot is only used when the figure is shown.
+    if args_im['show']:
+        return plt.subplots(figsize=args_im['figsize'])
+    # Headless: the figure is not registered by pyplot and is freed when no longer referenced.
+    fig = Figure(figsize=args_im['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    return fig, ax
+
+# %% Reduce data to the pixel grid
+@profiled
+def _reduce(data, row_labels, col_labels, args_im, square=False):
+    # The shape of the data and the block size are kept to draw the reduced data in the original coordinates
+    args_im['shape'], args_im['block'] = data.shape[:2], (1, 1)
+    if args_im['reduce'] is None:
+        # Out-of-core and sparse data is loaded in memory as is
+        return reduce.todense(data), row_labels, col_labels
+    block = _blocksize(data.shape, args_im)
+    # Square blocks keep the aspect ratio of the data, such as for images and the raster output
+    if square: block = (max(block), max(block))
+    args_im['block'] = block
+    if block==(1, 1):
+        return reduce.downsample(data, block), row_labels, col_labels
+
+    if args_im['verbose']>=3: print('[imagesc] >Reducing data of shape %s with blocks of %s using the %s.' %(str(data.shape[:2]), str(block), args_im['reduce']))
+    data = reduce.downsample(data, block, method=args_im['reduce'])
+    row_labels = reduce.downsample_labels(row_labels, block[0])
+    col_labels = reduce.downsample_labels(col_labels, block[1])
+    return data, row_labels, col_labels
+
+def _blocksize(data_shape, args_im):
+    # Number of pixels (rows, columns) that are available in the figure
+    pixels = (args_im['figsize'][1] * args_im['dpi'], args_im['figsize'][0] * args_im['dpi'])
+    return reduce.blocksize(data_shape, pixels)
+
 # %% Check input
+@profiled
 def _check_input(data, linewidth, args_im):
     # Must be >0
     if linewidth<0: linewidth=0
-    # Check cols and rows with linewidth
-    if ((data.shape[0]>100) or (data.shape[1]>100)) and (linewidth>0):
-        if args_im['verbose']>=2: print('[imagesc] >WARNING: Plot will be poorly visible if [linewidth>0] with rows/columns>100. Set linewidth=0 to adjust. [auto-adjusting...]' )
+    # Check the pixel size of the cells with linewidth
+    if (linewidth>0) and not grid.visible(data.shape, linewidth, args_im['figsize'], args_im['dpi']):
+        if args_im['verbose']>=2: print('[imagesc] >WARNING: Plot will be poorly visible if [linewidth>0] with cells smaller than %d pixels. Set linewidth=0 to adjust. [auto-adjusting...]' %(grid.MIN_PIXELS))
         linewidth=0
     
     return(linewidth)
 
 # %% Check input
-def _normalize(data, args_im):
+@profiled
+def _normalize(data, args_im, stats=None, source=None):
     if args_im['normalize']:
         if args_im['verbose'] >=3: print('[imagesc] >Normalzing data..')
-        data = (data - data.mean()) / (data.max() - data.min())
+        # Arrays that are created by imagesc, such as the reduced data, are normalized in-place.
+        inplace = (source is not None) and _owns(data, source)
+        data = normalize(data, method=args_im['normalize'], inplace=inplace, stats=stats)
     return(data)
 
+# %% Statistics for normalization
+@profiled
+def _stats(data, args_im):
+    # Computed in bands of rows so that out-of-core data is never fully loaded
+    return reduce.stats(data) if args_im['normalize'] in [True, 'global'] else None
+
+# %% Check whether the data is a floating point array that does not share memory with the input
+def _owns(data, source):
+    if not np.issubdtype(data.dtype, np.floating) or not data.flags.writeable:
+        return False
+    return not (isinstance(source, np.ndarray) and np.may_share_memory(data, source))
+
 # %%
 def set_labels(data_shape, row_labels, col_labels):
     if row_labels is None:
@@ -635,6 +1003,7 @@ def set_labels(data_shape, row_labels, col_labels):
     return(row_labels, col_labels)
 
 # %% Adjust figure size based on input
+@profiled
 def _set_figsize(data_shape, figsize):
     data_ratio = np.minimum(5/(data_shape[0]/data_shape[1]), 50)
     out = tuple(np.ceil(np.interp(data_shape-np.min(data_shape), [np.min(figsize), data_ratio], [np.max(figsize), data_ratio])))
@@ -700,6 +1069,7 @@ def _scale(X, vmax=100, make_round=True, verbose=3):
 
 
 # %%
+@profiled
 def _annotate_heatmap(im, data=None, valfmt="{x:.2f}", textcolors=["black", "white"], threshold=None, **textkw):
     """Function to annotate a heatmap.
 
@@ -721,36 +1091,9 @@ def _annotate_heatmap(im, data=None, valfmt="{x:.2f}", textcolors=["black", "whi
         applied.  If None (the default) uses the middle of the colormap as
         separation.  Optional.
     **kwargs
-        All other arguments are forwarded to each call to `text` used to create
-        the text labels.
+        All other arguments are forwarded to the text labels, such as fontsize
+        or min_pixels to drop the labels when cells are too small.
     """
-
-    if not isinstance(data, (list, np.ndarray)):
-        data = im.get_array()
-
-    # Normalize the threshold to the images color range.
-    if threshold is not None:
-        threshold = im.norm(threshold)
-    else:
-        threshold = im.norm(data.max())/2.
-
-    # Set default alignment to center, but allow it to be
-    # overwritten by textkw.
-    kw = dict(horizontalalignment="center",
-              verticalalignment="center")
-    kw.update(textkw)
-
-    # Get the formatter in case a string is supplied
-    if isinstance(valfmt, str):
-        valfmt = matplotlib.ticker.StrMethodFormatter(valfmt)
-
-    # Loop over the data and create a `Text` for each "pixel".
-    # Change the text's color depending on the data.
-    texts = []
-    for i in range(data.shape[0]):
-        for j in range(data.shape[1]):
-            kw.update(color=textcolors[int(im.norm(data[i, j]) > threshold)])
-            text = im.axes.text(j, i, valfmt(data[i, j], None), **kw)
-            texts.append(text)
-
-    return texts
+    # All cells are formatted at once and drawn by a single artist.
+    from imagesc.utils.annotate import annotate
+    return annotate(im, data=data, valfmt=valfmt, textcolors=textcolors, threshold=threshold, **textkw)
@@ -7,10 +7,11 @@
 
 import pandas as pd
 import numpy as np
-from ismember import ismember
+from imagesc.utils.profile import profiled
 
 # %%  Convert adjacency matrix to vector
-def vec2adjmat(source, target, weight=None, symmetric=True):
+@profiled
+def vec2adjmat(source, target, weight=None, symmetric=True, return_type='dense'):
     """Convert source and target into adjacency matrix.
 
     Parameters
@@ -23,6 +24,11 @@ def vec2adjmat(source, target, weight=None, symmetric=True):
         The Weights between the source-target values
     symmetric : bool, optional
         Make the adjacency matrix symmetric with the same number of rows as columns. The default is True.
+    return_type : str, optional
+        The output type. The default is 'dense'.
+            * 'dense' : pd.DataFrame
+            * 'sparse' : pd.DataFrame with sparse columns that are densified when needed.
+            * 'scipy' : tuple (scipy.sparse.csr_matrix, row labels, column labels)
 
     Returns
     -------
@@ -37,53 +43,81 @@ def vec2adjmat(source, target, weight=None, symmetric=True):
     >>> 
     >>> weight=[1,2,1,3]
     >>> vec2adjmat(source, target, weight=weight)
+    >>>
+    >>> # Millions of edges
+    >>> adjmat = vec2adjmat(source, target, return_type='sparse')
 
     """
     if len(source)!=len(target): raise Exception('[hnet] >Source and Target should have equal elements.')
-    if weight is None: weight = [1]*len(source)
-    
-    df = pd.DataFrame(np.c_[source, target], columns=['source','target'])
-    # Make adjacency matrix
-    adjmat = pd.crosstab(df['source'], df['target'], values=weight, aggfunc='sum').fillna(0)
-    # Get all unique nodes
-    nodes = np.unique(list(adjmat.columns.values)+list(adjmat.index.values))
-    # nodes = np.unique(np.c_[adjmat.columns.values, adjmat.index.values].flatten())
-
-    # Make the adjacency matrix symmetric
+    if return_type not in ['dense', 'sparse', 'scipy']: raise Exception('[imagesc] >return_type should be one of [\'dense\', \'sparse\', \'scipy\'].')
+    weight = np.ones(len(source)) if weight is None else np.asarray(weight, dtype=np.float64)
+
+    # Factorize the nodes once. Source and target are combined first so that they share a common dtype.
+    nodes = np.concatenate([np.asarray(source), np.asarray(target)])
     if symmetric:
-        # Add missing columns
-        node_columns = np.setdiff1d(nodes, adjmat.columns.values)
-        for node in node_columns:
-            adjmat[node]=0
-
-        # Add missing rows
-        node_rows = np.setdiff1d(nodes, adjmat.index.values)
-        adjmat=adjmat.T
-        for node in node_rows:
-            adjmat[node]=0
-        adjmat=adjmat.T
-
-        # Sort to make ordering of columns and rows similar
-        [IA, IB] = ismember(adjmat.columns.values, adjmat.index.values)
-        adjmat = adjmat.iloc[IB,:]
-        adjmat.index.name='source'
-        adjmat.columns.name='target'
+        # All unique nodes are used for both the rows and the columns.
+        # The target nodes come first, followed by the nodes that only occur as source.
+        unique_nodes, codes = np.unique(nodes, return_inverse=True)
+        is_target = np.zeros(len(unique_nodes), dtype=bool)
+        is_target[codes[len(source):]] = True
+        order = np.r_[np.flatnonzero(is_target), np.flatnonzero(~is_target)]
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = np.arange(len(order))
+        row_nodes = col_nodes = unique_nodes[order]
+        rows, cols = position[codes[:len(source)]], position[codes[len(source):]]
+    else:
+        row_nodes, rows = np.unique(nodes[:len(source)], return_inverse=True)
+        col_nodes, cols = np.unique(nodes[len(source):], return_inverse=True)
+    shape = (len(row_nodes), len(col_nodes))
 
+    if return_type=='dense':
+        # Weights of duplicate edges are summed
+        adjmat = np.bincount(np.ravel_multi_index((rows, cols), shape), weights=weight, minlength=shape[0] * shape[1]).reshape(shape)
+        adjmat = pd.DataFrame(adjmat, index=row_nodes, columns=col_nodes)
+    else:
+        from scipy.sparse import coo_matrix
+        # Weights of duplicate edges are summed by the conversion to CSR
+        adjmat = coo_matrix((weight, (rows, cols)), shape=shape).tocsr()
+        if return_type=='scipy':
+            return adjmat, row_nodes, col_nodes
+        adjmat = _sparse_frame(adjmat, row_nodes, col_nodes)
+
+    adjmat.index.name='source'
+    adjmat.columns.name='target'
     return(adjmat)
 
 
+# %% Sparse DataFrame
+def _sparse_frame(adjmat, index, columns):
+    # The frame is created at once from the sparse matrix. Missing edges should be zero, but some pandas
+    # versions use NaN as fill value for floats. The fill value is then changed without densifying the columns.
+    adjmat = pd.DataFrame.sparse.from_spmatrix(adjmat, index=index, columns=columns)
+    # The arrays are changed before the dtypes of the frame are requested, which are cached by pandas.
+    if adjmat.shape[1]>0 and adjmat.iloc[:, 0].array.fill_value!=0:
+        for _, column in adjmat.items():
+            column.array.fill_value = 0
+    return adjmat
+
+
 # %%  Convert adjacency matrix to vector
-def adjmat2vec(adjmat, min_weight=0, verbose=3):
+@profiled
+def adjmat2vec(adjmat, min_weight=0, chunksize=None, verbose=3):
     """Convert adjacency matrix into vector with source and target.
 
     Parameters
     ----------
     adjmat : pd.DataFrame()
-        Adjacency matrix.
+        Adjacency matrix. Sparse DataFrames, scipy.sparse matrices and the tuple
+        (matrix, row labels, column labels) of vec2adjmat(return_type='scipy') are also supported.
+        For sparse input, only the stored edges are returned.
 
     min_weight : float
         edges are returned with a minimum weight.
 
+    chunksize : int
+        Number of rows of the adjacency matrix that is processed at once.
+        If set, a generator is returned that yields a pd.DataFrame for each chunk.
+
     Returns
     -------
     pd.DataFrame()
@@ -95,18 +129,200 @@ def adjmat2vec(adjmat, min_weight=0, verbose=3):
     >>> target=['Sprinkler','Rain','Wet_Grass','Wet_Grass']
     >>> adjmat = vec2adjmat(source, target)
     >>> vector = adjmat2vec(adjmat)
+    >>>
+    >>> # Stream the edges of a huge matrix
+    >>> for vector in adjmat2vec(adjmat, min_weight=1, chunksize=1000):
+    >>>     print(vector)
 
     """
-    # Convert adjacency matrix into vector
-    adjmat = adjmat.stack().reset_index()
-    # Set columns
-    adjmat.columns = ['source', 'target', 'weight']
-    # Remove self loops and no-connected edges
-    # Iloc1 = adjmat['source']!=adjmat['target']
-    Iloc2 = adjmat['weight']>=min_weight
-    # Iloc = Iloc1 & Iloc2
-    Iloc = Iloc2
-    # Take only connected nodes
-    adjmat = adjmat.loc[Iloc, :]
-    adjmat.reset_index(drop=True, inplace=True)
-    return(adjmat)
+    values, index, columns = _adjmat_values(adjmat)
+    if chunksize is not None:
+        return _adjmat2vec_chunks(values, index, columns, min_weight, chunksize)
+    return _edges(values, index, columns, min_weight, 0)
+
+
+def _adjmat2vec_chunks(values, index, columns, min_weight, chunksize):
+    for start in range(0, values.shape[0], chunksize):
+        yield _edges(values[start:start + chunksize], index, columns, min_weight, start)
+
+
+def _adjmat_values(adjmat):
+    # Returns the (sparse) values with the row and column labels
+    if isinstance(adjmat, tuple):
+        return adjmat[0].tocsr(), np.asarray(adjmat[1]), np.asarray(adjmat[2])
+    if isinstance(adjmat, pd.DataFrame):
+        index, columns = adjmat.index.values, adjmat.columns.values
+        if len(adjmat.columns)>0 and all(isinstance(dtype, pd.SparseDtype) for dtype in adjmat.dtypes):
+            return adjmat.sparse.to_coo().tocsr(), index, columns
+        return adjmat.to_numpy(), index, columns
+    # scipy.sparse matrix without labels
+    return adjmat.tocsr(), np.arange(adjmat.shape[0]), np.arange(adjmat.shape[1])
+
+
+def _edges(values, index, columns, min_weight, offset):
+    # Select the edges with at least the minimum weight, in row-major order.
+    if isinstance(values, np.ndarray):
+        with np.errstate(invalid='ignore'):
+            rows, cols = np.nonzero(values >= min_weight)
+        weight = values[rows, cols]
+    else:
+        values = values.tocoo()
+        keep = values.data >= min_weight
+        rows, cols, weight = values.row[keep], values.col[keep], values.data[keep]
+        order = np.lexsort((cols, rows))
+        rows, cols, weight = rows[order], cols[order], weight[order]
+
+    return pd.DataFrame({'source': index[rows + offset], 'target': columns[cols], 'weight': weight})
+
+
+# %% Incremental adjacency matrix
+class AdjacencyAccumulator:
+    """Build an adjacency matrix incrementally from batches of edges.
+
+    The edges follow the semantics of vec2adjmat: weights of duplicate edges are summed and
+    the resulting adjacency matrix is identical to vec2adjmat on all edges that were added.
+    New edges are kept in resizable buffers and are merged into a sparse matrix when the
+    adjacency matrix is requested. Edges that were added before are never processed again.
+
+    Parameters
+    ----------
+    symmetric : bool, optional
+        Make the adjacency matrix symmetric with the same number of rows as columns. The default is True.
+
+    Examples
+    --------
+    >>> acc = AdjacencyAccumulator()
+    >>> acc.add(['Cloudy','Cloudy'], ['Sprinkler','Rain'])
+    >>> acc.add(['Sprinkler','Rain'], ['Wet_Grass','Wet_Grass'], weight=[1,3])
+    >>> adjmat = acc.adjmat()
+    >>> fig, ax = acc.heatmap(kind='fast')
+
+    """
+
+    def __init__(self, symmetric=True):
+        self.symmetric = symmetric
+        # Node label to position, in the order of appearance
+        self._rows = {}
+        self._cols = self._rows if symmetric else {}
+        # Nodes that occur as target. Used to order the nodes similar to vec2adjmat.
+        self._is_target = np.zeros(0, dtype=bool)
+        # Buffers with the edges that are not yet merged into the matrix
+        self._buffer = {'row': np.zeros(1024, dtype=np.intp), 'col': np.zeros(1024, dtype=np.intp), 'weight': np.zeros(1024, dtype=np.float64)}
+        self._n = 0
+        self._matrix = None
+        self.n_edges = 0
+
+    @property
+    def shape(self):
+        return (len(self._rows), len(self._cols))
+
+    def add(self, source, target, weight=None):
+        """Add a batch of edges.
+
+        Parameters
+        ----------
+        source : list
+            The source node.
+        target : list
+            The target node.
+        weight : list of int
+            The Weights between the source-target values
+
+        """
+        if len(source)!=len(target): raise Exception('[imagesc] >Source and Target should have equal elements.')
+        weight = np.ones(len(source)) if weight is None else np.asarray(weight, dtype=np.float64)
+        rows = _codes(np.asarray(source), self._rows)
+        cols = _codes(np.asarray(target), self._cols)
+        if self.symmetric:
+            self._is_target = np.r_[self._is_target, np.zeros(len(self._rows) - len(self._is_target), dtype=bool)]
+            self._is_target[cols] = True
+
+        # Grow the buffers by doubling
+        n = self._n + len(rows)
+        if n > len(self._buffer['row']):
+            size = max(n, 2 * len(self._buffer['row']))
+            for name in self._buffer:
+                self._buffer[name] = np.resize(self._buffer[name], size)
+        self._buffer['row'][self._n:n] = rows
+        self._buffer['col'][self._n:n] = cols
+        self._buffer['weight'][self._n:n] = weight
+        self._n = n
+        self.n_edges += len(rows)
+
+    def adjmat(self, return_type='dense'):
+        """Adjacency matrix of all edges that are added so far.
+
+        Parameters
+        ----------
+        return_type : str, optional
+            The output type, see vec2adjmat. The default is 'dense'.
+
+        Returns
+        -------
+        pd.DataFrame
+            adjacency matrix.
+
+        """
+        from scipy.sparse import coo_matrix
+        # Merge the new edges into the sparse matrix
+        if self._matrix is None:
+            self._matrix = coo_matrix(self.shape).tocsr()
+        if self._matrix.shape!=self.shape:
+            self._matrix.resize(self.shape)
+        if self._n>0:
+            new = coo_matrix((self._buffer['weight'][:self._n], (self._buffer['row'][:self._n], self._buffer['col'][:self._n])), shape=self.shape)
+            self._matrix = self._matrix + new.tocsr()
+            self._n = 0
+
+        # Order the nodes similar to vec2adjmat
+        row_labels, col_labels = np.asarray(list(self._rows.keys())), np.asarray(list(self._cols.keys()))
+        if self.symmetric:
+            order = np.argsort(row_labels, kind='stable')
+            row_order = col_order = np.r_[order[self._is_target[order]], order[~self._is_target[order]]]
+        else:
+            row_order, col_order = np.argsort(row_labels, kind='stable'), np.argsort(col_labels, kind='stable')
+        adjmat = self._matrix[row_order][:, col_order]
+        row_labels, col_labels = row_labels[row_order], col_labels[col_order]
+
+        if return_type=='scipy':
+            return adjmat, row_labels, col_labels
+        if return_type=='sparse':
+            adjmat = _sparse_frame(adjmat, row_labels, col_labels)
+        else:
+            adjmat = pd.DataFrame(adjmat.toarray(), index=row_labels, columns=col_labels)
+        adjmat.index.name='source'
+        adjmat.columns.name='target'
+        return adjmat
+
+    def heatmap(self, kind='fast', **args):
+        """Heatmap of the current adjacency matrix.
+
+        Parameters
+        ----------
+        kind : String, (default: 'fast')
+            The heatmap function that is used: 'fast', 'plot', 'clean', 'seaborn' or 'cluster'.
+        **args
+            Arguments that are passed to the heatmap function.
+
+        Notes
+        -----
+        fast, plot and clean reduce the sparse matrix without creating the dense matrix.
+        seaborn and cluster require the dense matrix.
+
+        """
+        from imagesc import imagesc
+        if kind in ['fast', 'plot', 'clean']:
+            adjmat, row_labels, col_labels = self.adjmat(return_type='scipy')
+        else:
+            adjmat = self.adjmat()
+            adjmat, row_labels, col_labels = adjmat.values, adjmat.index.values, adjmat.columns.values
+        return getattr(imagesc, kind)(adjmat, row_labels, col_labels, **args)
+
+
+def _codes(labels, index):
+    # Positions of the labels. New labels are appended to the index.
+    uniques, inverse = np.unique(labels, return_inverse=True)
+    for label in uniques:
+        if label not in index:
+            index[label] = len(index)
+    return np.fromiter((index[label] for label in uniques), dtype=np.intp, count=len(uniques))[inverse]
@@ -0,0 +1,138 @@
+""" Animated heatmaps from a stream of frames."""
+# --------------------------------------------------------------------------
+# Name        : animate.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc.utils.renderer import HeatmapRenderer
+from imagesc.utils.profile import profiled
+import numpy as np
+import subprocess
+import itertools
+import os
+
+
+# %% Animate
+@profiled
+def animate(frames, out='heatmap.gif', fps=10, row_labels=None, col_labels=None, verbose=3, **args):
+    """Animated heatmap.
+
+    A single figure is created with the layout of fast(), and for every frame only the image data
+    is replaced, see HeatmapRenderer. The frames are rendered one by one when the encoder asks for them,
+    so a generator of frames is never loaded in memory as a whole. Note that Pillow keeps the
+    palette-encoded frames of a gif until the file is written, whereas ffmpeg encodes the frames directly.
+
+    Parameters
+    ----------
+    frames : array-like or iterable
+        Array of shape (frames, N, M), such as a np.memmap, or an iterable of arrays of shape (N, M).
+    out : String, (default: 'heatmap.gif')
+        Path of the output file.
+            * '.gif' : Pillow is used.
+            * '.mp4' and other video formats : ffmpeg is used.
+    fps : int, (default: 10)
+        Frames per second.
+    row_labels : List
+        A list or array of length N with the labels for the rows.
+    col_labels : List
+        A list or array of length M with the labels for the columns.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+    **args
+        Arguments of fast(), such as cmap, vmin, vmax, normalize, figsize and dpi.
+        Without vmin and vmax, the color range of the first frame is used for all frames, see clim of HeatmapRenderer.
+
+    Returns
+    -------
+    String
+        Path of the output file.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> frames = (np.random.rand(50, 50) for i in range(100))
+    >>> path = imagesc.animate(frames, out='heatmap.gif', fps=10, vmin=0, vmax=1)
+
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError('[imagesc] >frames should contain at least one frame.')
+    first = np.asarray(first)
+
+    args['show'] = False
+    args.setdefault('verbose', verbose)
+    renderer = HeatmapRenderer(first.shape, row_labels=row_labels, col_labels=col_labels, **args)
+    # Every frame is rendered when the encoder asks for it
+    pixels = (np.array(renderer.update(frame).buffer()) for frame in itertools.chain([first], frames))
+
+    dirpath = os.path.dirname(out)
+    if dirpath!='' and not os.path.isdir(dirpath):
+        os.makedirs(dirpath, exist_ok=True)
+    try:
+        if out.lower().endswith('.gif'):
+            n = _write_gif(pixels, out, fps)
+        else:
+            n = _write_ffmpeg(pixels, out, fps, renderer.fig.canvas.get_width_height())
+    finally:
+        renderer.close()
+
+    if verbose>=3: print('[imagesc] >%d frames are written to [%s].' %(n, out))
+    return out
+
+
+def _write_gif(pixels, out, fps):
+    from PIL import Image
+    count = [0]
+
+    def _images():
+        for rgba in pixels:
+            count[0] += 1
+            yield Image.fromarray(rgba)
+
+    images = _images()
+    next(images).save(out, save_all=True, append_images=images, duration=1000 / fps, loop=0)
+    return count[0]
+
+
+def _write_ffmpeg(pixels, out, fps, size):
+    import matplotlib
+    from matplotlib.animation import FFMpegWriter
+    if not FFMpegWriter.isAvailable():
+        raise ValueError('[imagesc] >ffmpeg is required to write [%s]. Install ffmpeg or use the .gif extension.' %(out))
+    # Raw RGBA frames are piped into ffmpeg. The size is padded to even numbers for the yuv420p format.
+    command = [matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-vcodec', 'rawvideo', '-pix_fmt', 'rgba', '-s', '%dx%d' %(size[0], size[1]), '-framerate', str(fps), '-i', 'pipe:',
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', out]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    n = 0
+    try:
+        for rgba in pixels:
+            process.stdin.write(rgba.tobytes())
+            n += 1
+    except BrokenPipeError as exc:
+        # ffmpeg stopped before all frames were written. The reason is in its error output.
+        _finish_ffmpeg(process, cause=exc)
+        raise
+    except BaseException:
+        # The original exception, such as an error in a frame, is raised and ffmpeg is stopped
+        process.kill()
+        _finish_ffmpeg(process, check=False)
+        raise
+    _finish_ffmpeg(process)
+    return n
+
+
+def _finish_ffmpeg(process, cause=None, check=True):
+    try:
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    error = process.stderr.read()
+    process.stderr.close()
+    if process.wait()!=0 and check:
+        raise RuntimeError('[imagesc] >ffmpeg failed: %s' %(error.decode(errors='ignore'))) from cause
@@ -0,0 +1,211 @@
+""" Annotation of heatmap cells with a single artist."""
+# --------------------------------------------------------------------------
+# Name        : annotate.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from matplotlib.artist import Artist
+from matplotlib.text import Text
+from matplotlib.transforms import IdentityTransform
+from matplotlib.backends.backend_agg import RendererAgg
+import matplotlib
+import numpy as np
+
+
+# %% Format values
+def format_values(data, valfmt="{x:.2f}"):
+    """Format all values of the data.
+
+    Each unique value is formatted only once, which makes this fast for data with repeated values such as counts.
+
+    Parameters
+    ----------
+    data : numpy array
+        data array.
+    valfmt : String or matplotlib.ticker.Formatter, (default: "{x:.2f}")
+        Format such as "{x:.2f}", "%.2f" or a matplotlib Formatter.
+
+    Returns
+    -------
+    numpy array
+        Array with strings of the same shape as data.
+
+    """
+    data = np.asarray(data)
+    values, inverse = np.unique(data, return_inverse=True)
+    if isinstance(valfmt, str) and ('{' not in valfmt):
+        # printf-style formats are applied in a single call.
+        labels = np.char.mod(valfmt, values)
+    else:
+        if isinstance(valfmt, str):
+            valfmt = matplotlib.ticker.StrMethodFormatter(valfmt)
+        labels = np.array([valfmt(value, None) for value in values], dtype=object)
+    return np.asarray(labels, dtype=object)[inverse].reshape(data.shape)
+
+
+# %% Annotations
+class Annotations(Artist):
+    """Artist that draws the text labels of all cells.
+
+    A single Text instance is reused for all cells instead of creating one artist per cell.
+    Only the cells that are in view are drawn, and nothing is drawn when a cell is smaller than min_pixels.
+    By default, this is the height of the font so that labels that can not be read are dropped.
+
+    Parameters
+    ----------
+    x, y : numpy array
+        Centers of the cells in data coordinates.
+    labels : numpy array
+        Text of each cell.
+    colors : numpy array
+        Color of each cell.
+    min_pixels : float, (default: None)
+        Minimum width and height of a cell in pixels to draw the labels. None uses the font size in pixels.
+    **textkw
+        Arguments for matplotlib.text.Text, such as fontsize.
+
+    """
+
+    def __init__(self, x, y, labels, colors, min_pixels=None, **textkw):
+        super().__init__()
+        self._x = np.ravel(x)
+        self._y = np.ravel(y)
+        self._labels = np.ravel(labels)
+        self._colors = np.ravel(colors)
+        self.min_pixels = min_pixels
+        self._text = Text(**textkw)
+        self._text.set_transform(IdentityTransform())
+
+    def get_children(self):
+        return [self._text]
+
+    def draw(self, renderer):
+        if not self.get_visible() or len(self._labels)==0:
+            return
+        ax = self.axes
+        # Size of a single cell in pixels
+        cell = np.abs(np.diff(ax.transData.transform([[0, 0], [1, 1]]), axis=0)).min()
+        min_pixels = self.min_pixels
+        if min_pixels is None:
+            min_pixels = self._text.get_fontsize() * self.figure.dpi / 72
+        if cell < min_pixels:
+            return
+
+        # Positions of all cells in pixels, computed at once
+        xy = ax.transData.transform(np.c_[self._x, self._y])
+        bbox = ax.bbox
+        inview = np.flatnonzero((xy[:, 0]>=bbox.x0) & (xy[:, 0]<=bbox.x1) & (xy[:, 1]>=bbox.y0) & (xy[:, 1]<=bbox.y1))
+
+        text = self._text
+        text.set_figure(self.figure)
+        if isinstance(renderer, RendererAgg):
+            # Raster output: every unique label is rendered once and pasted into a single image.
+            self._draw_overlay(renderer, xy, inview, bbox)
+        else:
+            # Vector output keeps the labels as text.
+            for i in inview:
+                text.set_position(xy[i])
+                text.set_text(self._labels[i])
+                text.set_color(self._colors[i])
+                text.draw(renderer)
+        self.stale = False
+
+    def _draw_overlay(self, renderer, xy, inview, bbox):
+        x0, y0 = int(np.floor(bbox.x0)), int(np.floor(bbox.y0))
+        width, height = int(np.ceil(bbox.x1)) - x0, int(np.ceil(bbox.y1)) - y0
+        overlay = np.zeros((height, width, 4), dtype=np.uint8)
+        bitmaps = {}
+        for i in inview:
+            key = (self._labels[i], self._colors[i])
+            if key not in bitmaps:
+                bitmaps[key] = self._bitmap(renderer, *key)
+            bitmap = bitmaps[key]
+            # Top-left corner in the overlay. Rows of the overlay run from top to bottom.
+            left = int(round(xy[i, 0] - x0 - bitmap.shape[1] / 2))
+            top = int(round(height - (xy[i, 1] - y0) - bitmap.shape[0] / 2))
+            # Crop the parts that fall outside the axes
+            r0, c0 = max(top, 0), max(left, 0)
+            r1, c1 = min(top + bitmap.shape[0], height), min(left + bitmap.shape[1], width)
+            if r1<=r0 or c1<=c0: continue
+            patch = bitmap[r0 - top:r1 - top, c0 - left:c1 - left]
+            region = overlay[r0:r1, c0:c1]
+            np.copyto(region, patch, where=patch[:, :, 3:4] > region[:, :, 3:4])
+
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, x0, y0, overlay[::-1])
+        gc.restore()
+
+    def _bitmap(self, renderer, label, color):
+        # Render a single label on a transparent canvas of its own size.
+        text = self._text
+        text.set_text(label)
+        text.set_color(color)
+        width, height, _ = renderer.get_text_width_height_descent(label, text.get_fontproperties(), ismath='TeX' if text.get_usetex() else False)
+        size = (int(np.ceil(width)) + 4, int(np.ceil(height)) + 4)
+        canvas = RendererAgg(size[0], size[1], renderer.dpi)
+        text.set_position((size[0] / 2, size[1] / 2))
+        text.draw(canvas)
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+
+# %% Annotate heatmap
+def annotate(im, data=None, valfmt="{x:.2f}", textcolors=("black", "white"), threshold=None, min_pixels=None, **textkw):
+    """Annotate a heatmap.
+
+    Parameters
+    ----------
+    im
+        The AxesImage to be labeled.
+    data
+        Data used to annotate, in the same layout as the image array. If None, the image's data is used.
+    valfmt
+        The format of the annotations inside the heatmap, e.g. "$ {x:.2f}", "%.2f" or a `matplotlib.ticker.Formatter`.
+    textcolors
+        Two color specifications. The first is used for values below a threshold, the second for those above.
+    threshold
+        Value in data units according to which the colors from textcolors are applied.
+        If None (the default) uses the middle of the colormap as separation.
+    min_pixels
+        Minimum size of a cell in pixels to draw the labels. None uses the font size in pixels.
+    **textkw
+        All other arguments are forwarded to the text.
+
+    Returns
+    -------
+    Annotations
+        The artist that is added to the axes.
+
+    """
+    if not isinstance(data, (list, np.ndarray)):
+        data = im.get_array()
+    data = np.ma.getdata(data)
+
+    # Normalize the threshold to the images color range.
+    if threshold is not None:
+        threshold = im.norm(threshold)
+    else:
+        threshold = im.norm(np.nanmax(data)) / 2.
+
+    # Text colors of all cells at once
+    colors = np.asarray(textcolors, dtype=object)[(np.ma.filled(im.norm(data), 0) > threshold).astype(int)]
+    labels = format_values(data, valfmt)
+
+    # Centers of the cells based on the extent and origin of the image
+    left, right, bottom, top = im.get_extent()
+    nrows, ncols = data.shape[0], data.shape[1]
+    x = left + (np.arange(ncols) + 0.5) * (right - left) / ncols
+    if im.origin=='upper':
+        y = top + (np.arange(nrows) + 0.5) * (bottom - top) / nrows
+    else:
+        y = bottom + (np.arange(nrows) + 0.5) * (top - bottom) / nrows
+    x, y = np.meshgrid(x, y)
+
+    # Set default alignment to center, but allow it to be overwritten by textkw.
+    kw = dict(horizontalalignment="center", verticalalignment="center")
+    kw.update(textkw)
+    artist = Annotations(x, y, labels, colors, min_pixels=min_pixels, **kw)
+    im.axes.add_artist(artist)
+    return artist
@@ -0,0 +1,144 @@
+""" Render many heatmaps in parallel using a process pool."""
+# --------------------------------------------------------------------------
+# Name        : batch.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+from imagesc.utils.profile import profiled
+import numpy as np
+import time
+import os
+
+
+# %% Render many
+@profiled
+def render_many(arrays, kind='fast', out_dir='.', workers=None, names=None, verbose=3, **args):
+    """Render many heatmaps in parallel and write them to disk.
+
+    The arrays are handed to the worker processes through shared memory instead of pickling.
+    Each worker calls imagesc.render() and therefore uses the same defaults as the single-call functions.
+
+    Parameters
+    ----------
+    arrays : iterable of numpy arrays
+        The data arrays. Generators are consumed lazily.
+    kind : String, (default: 'fast')
+        The heatmap function that is used: 'fast', 'plot', 'clean', 'seaborn' or 'cluster'.
+    out_dir : String, (default: '.')
+        Directory to write the figures to.
+    workers : int, (default: None)
+        Number of worker processes. None uses the number of CPUs.
+    names : iterable of String, (default: None)
+        File names of the figures, such as 'customer_1.png'. None uses 'heatmap_<index>.png'.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+    **args
+        Arguments that are passed to the heatmap function, such as row_labels, col_labels, cmap or dpi.
+
+    Returns
+    -------
+    list of dict
+        For each array, in the input order:
+            * 'index' : position in the input.
+            * 'filepath' : path of the figure.
+            * 'time' : render time in seconds in the worker.
+            * 'error' : None or the error message when rendering failed.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> arrays = (np.random.rand(20, 30) for _ in range(100))
+    >>> results = imagesc.render_many(arrays, kind='fast', out_dir='heatmaps', workers=4)
+    >>> failed = [r for r in results if r['error'] is not None]
+
+    """
+    if workers is None: workers = os.cpu_count() or 1
+    args['verbose'] = verbose
+    os.makedirs(out_dir, exist_ok=True)
+    names = iter(names) if names is not None else None
+
+    results, pending = [], {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for i, data in enumerate(arrays):
+            # Limit the number of arrays that are simultaneously kept in shared memory
+            if len(pending)>=2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend([_collect(future, pending) for future in done])
+
+            filename = next(names) if names is not None else 'heatmap_%05d.png' %(i)
+            filepath = os.path.join(out_dir, filename)
+            try:
+                data = np.asarray(data)
+                shm = _to_shared_memory(data)
+            except Exception as e:
+                results.append({'index': i, 'filepath': filepath, 'time': 0.0, 'error': repr(e)})
+                continue
+            future = executor.submit(_worker, shm.name, data.shape, data.dtype.str, kind, filepath, args)
+            pending[future] = (i, filepath, shm)
+
+        done, _ = wait(pending)
+        results.extend([_collect(future, pending) for future in done])
+
+    results = sorted(results, key=lambda r: r['index'])
+    if verbose>=3:
+        n_failed = len([r for r in results if r['error'] is not None])
+        print('[imagesc] >Rendered %d heatmaps in %.1f sec. [%d failed]' %(len(results), time.perf_counter() - start, n_failed))
+    if verbose>=2:
+        for r in results:
+            if r['error'] is not None: print('[imagesc] >Warning: heatmap %d failed: %s' %(r['index'], r['error']))
+
+    return results
+
+
+# %% Collect the result of a worker and free the shared memory
+def _collect(future, pending):
+    i, filepath, shm = pending.pop(future)
+    try:
+        duration, error = future.result()
+    except Exception as e:
+        # The worker process itself failed, e.g. it was killed.
+        duration, error = 0.0, repr(e)
+    finally:
+        shm.close()
+        shm.unlink()
+    return {'index': i, 'filepath': filepath, 'time': duration, 'error': error}
+
+
+# %% Copy array into shared memory
+def _to_shared_memory(data):
+    if data.dtype.hasobject:
+        raise TypeError('[imagesc] >Arrays with dtype object can not be rendered.')
+    shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[...] = data
+    return shm
+
+
+# %% Worker
+def _worker(name, shape, dtype, kind, filepath, args):
+    from imagesc.imagesc import render
+    start = time.perf_counter()
+    try:
+        # The parent process owns the shared memory and takes care of unlinking it.
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+
+    error = None
+    try:
+        data = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        render(data, kind=kind, filepath=filepath, **args)
+    except Exception as e:
+        error = repr(e)
+    finally:
+        # Release the view before closing the buffer.
+        data = None
+        shm.close()
+
+    return time.perf_counter() - start, error
@@ -0,0 +1,124 @@
+""" Content-hash based caching."""
+# --------------------------------------------------------------------------
+# Name        : cache.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from collections import OrderedDict
+import numpy as np
+import hashlib
+import os
+
+
+# %% Hash
+def hash_key(*parts):
+    """Hash of numpy arrays and parameters.
+
+    Parameters
+    ----------
+    *parts
+        numpy arrays or parameters with a stable string representation, such as str, int, float, tuple or None.
+
+    Returns
+    -------
+    String
+        Hexadecimal hash.
+
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            # Shape and dtype are part of the key because the buffer alone is ambiguous.
+            h.update(repr((part.shape, part.dtype.str)).encode())
+            h.update(memoryview(np.ascontiguousarray(part)).cast('B'))
+        else:
+            h.update(repr(part).encode())
+        # Separator between the parts
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+# %% Least recently used cache
+class LRUCache:
+    """In memory cache that evicts the least recently used items.
+
+    Parameters
+    ----------
+    maxsize : int, (default: 32)
+        Maximum number of items.
+
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+# %% Size based eviction of files
+def evict(directory, prefix, max_bytes, keep=None):
+    """Remove the least recently used entries until the total size is below max_bytes.
+
+    All files named <prefix><key>.<extension> belong to the same entry and are removed together.
+    The modification time of the files is used as the time of last use.
+
+    Parameters
+    ----------
+    directory : String
+        Directory of the cache.
+    prefix : String
+        Prefix of the files.
+    max_bytes : int
+        Maximum total size of the files in bytes.
+    keep : String, (default: None)
+        Entry <prefix><key> that is never removed, such as the entry that was just written.
+
+    Returns
+    -------
+    int
+        Number of removed entries.
+
+    """
+    entries = {}
+    for filename in os.listdir(directory):
+        if not filename.startswith(prefix): continue
+        filepath = os.path.join(directory, filename)
+        stat = os.stat(filepath)
+        entry = entries.setdefault(filename.split('.')[0], {'files': [], 'size': 0, 'time': 0})
+        entry['files'].append(filepath)
+        entry['size'] += stat.st_size
+        entry['time'] = max(entry['time'], stat.st_mtime)
+
+    total = sum(entry['size'] for entry in entries.values())
+    removed = 0
+    for name, entry in sorted(entries.items(), key=lambda item: item[1]['time']):
+        if total<=max_bytes: break
+        if name==keep: continue
+        for filepath in entry['files']:
+            os.remove(filepath)
+        total -= entry['size']
+        removed += 1
+    return removed
@@ -0,0 +1,350 @@
+""" Compact interactive heatmap in html with a binary payload."""
+# --------------------------------------------------------------------------
+# Name        : d3export.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc.utils import reduce, raster
+from imagesc.utils.cache import evict
+from imagesc.utils.profile import profiled
+from shutil import copyfile
+from html import escape
+import numpy as np
+import webbrowser
+import tempfile
+import filecmp
+import base64
+import json
+import time
+import os
+
+# Little-endian, which is the byte order of typed arrays in the browser.
+DTYPES = {'uint8': np.dtype('<u1'), 'uint16': np.dtype('<u2')}
+PAYLOADS = ['base64', 'file']
+# Default directory of the cached html files.
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'imagesc_d3')
+
+
+# %% Export
+@profiled
+def heatmap(df, path, title='Co-occurrence heatmap', description=None, vmin=None, vmax=None, width=720, height=720, cmap='coolwarm', dtype='uint8', payload='base64', max_cells=None, showfig=True, stroke='red', verbose=3):
+    """Interactive heatmap with the values stored as quantized typed arrays.
+
+    The values are quantized into unsigned integers between vmin and vmax, where the largest
+    integer is reserved for missing values (NaN). Instead of a JSON object per cell, a single
+    binary array is stored, which is drawn on a canvas in the browser. The hover shows the
+    row, the column and the value of the cell up to the quantization precision.
+
+    Parameters
+    ----------
+    df : pd.DataFrame()
+        Input data. The index and column names are used for the row/column naming.
+    path : String
+        Path to save the output, such as 'c://temp/index.html'
+    title : String, (default: 'Co-occurrence heatmap')
+        Title text.
+    description : String, (default: None)
+        Description text of the heatmap.
+    vmin : float, (default: None)
+        Minimum of the color range. None uses the minimum value in the data.
+    vmax : float, (default: None)
+        Maximum of the color range. None uses the maximum value in the data.
+    width : int, (default: 720).
+        Width of the heatmap.
+    height : int, (default: 720).
+        Height of the heatmap.
+    cmap : String, (default: 'coolwarm')
+        Name of the matplotlib colormap.
+    dtype : String, (default: 'uint8')
+        Quantization of the values.
+            * 'uint8' : 255 levels.
+            * 'uint16' : 65535 levels.
+    payload : String, (default: 'base64')
+        Storage of the values.
+            * 'base64' : Embedded in the html.
+            * 'file' : Binary file next to the html. Browsers only load this file when the html is served over http, e.g. using: python -m http.server
+    max_cells : int, (default: None)
+        Data with more cells is reduced to this number of cells by averaging blocks of cells. None does not reduce the data.
+    showfig : Bool, (default: True)
+        Open browser with heatmap.
+    stroke : String, (default: 'red').
+        Color of the rectangle when hovering over a cell.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        'path', 'filesize' in bytes, 'time' in seconds, 'shape' of the exported data and the 'block' size of the reduction.
+
+    """
+    start = time.time()
+    if dtype not in DTYPES:
+        raise ValueError('[imagesc] >dtype should be one of %s' %(list(DTYPES.keys())))
+    if payload not in PAYLOADS:
+        raise ValueError('[imagesc] >payload should be one of %s' %(PAYLOADS))
+
+    data = np.asarray(df.values, dtype=np.float64)
+    row_labels, col_labels = df.index.astype(str).values, df.columns.astype(str).values
+    # Reduce to the budget of cells
+    block = (1, 1)
+    if max_cells is not None and data.size>max_cells:
+        factor = np.sqrt(data.size / max_cells)
+        block = reduce.blocksize(data.shape, (data.shape[0] / factor, data.shape[1] / factor))
+        if verbose>=3: print('[imagesc] >Reducing data of shape %s with blocks of %s.' %(str(data.shape), str(block)))
+        data = reduce.downsample(data, block, method='mean')
+        row_labels = reduce.downsample_labels(row_labels, block[0])
+        col_labels = reduce.downsample_labels(col_labels, block[1])
+
+    values, vmin, vmax = quantize(data, vmin=vmin, vmax=vmax, dtype=dtype)
+    # Colors of the quantized values followed by the color of missing values
+    table = raster.lut(cmap)
+    N = table.shape[0] - 3
+    colors = np.r_[table[:N], table[N + 2:N + 3]]
+
+    dirpath, filename = os.path.split(path)
+    meta = {'rows': row_labels.tolist(),
+            'cols': col_labels.tolist(),
+            'shape': list(data.shape),
+            'vmin': vmin,
+            'vmax': vmax,
+            'dtype': dtype,
+            'colors': base64.b64encode(colors.tobytes()).decode('ascii'),
+            'width': width,
+            'height': height,
+            'stroke': stroke,
+            }
+    if payload=='base64':
+        meta['data'] = base64.b64encode(values.tobytes()).decode('ascii')
+    else:
+        binname = os.path.splitext(filename)[0] + '.bin'
+        with open(os.path.join(dirpath, binname), 'wb') as f:
+            f.write(values.tobytes())
+        meta['src'] = binname
+
+    # Text is escaped so that it can not add markup or scripts to the page
+    html = TEMPLATE.replace('$TITLE$', escape(str(title)))
+    html = html.replace('$DESCRIPTION$', '' if description is None else escape(str(description)))
+    # Labels can not close the script tag
+    html = html.replace('$META$', json.dumps(meta).replace('</', '<\\/'))
+    with open(path, 'w', encoding='utf8') as f:
+        f.write(html)
+
+    filesize = os.path.getsize(path)
+    if payload=='file':
+        filesize += os.path.getsize(os.path.join(dirpath, meta['src']))
+    out = {'filename': filename, 'dirpath': dirpath, 'path': path, 'filesize': filesize, 'time': time.time() - start, 'shape': data.shape, 'block': block}
+    if verbose>=3: print('[imagesc] >Heatmap of %d bytes is written to [%s] in %.2f sec.' %(filesize, path, out['time']))
+    if showfig: webbrowser.open(path, new=1)
+    return out
+
+
+# %% Quantize
+def quantize(data, vmin=None, vmax=None, dtype='uint8'):
+    """Quantize the values between vmin and vmax into unsigned integers.
+
+    Parameters
+    ----------
+    data : numpy array
+        data array.
+    vmin : float, (default: None)
+        Minimum value. None uses the minimum value in the data.
+    vmax : float, (default: None)
+        Maximum value. None uses the maximum value in the data.
+    dtype : String, (default: 'uint8')
+        'uint8' or 'uint16'. The largest integer is used for missing values.
+        Infinite values are clipped to the codes of vmin and vmax.
+
+    Returns
+    -------
+    tuple
+        Quantized values, vmin and vmax.
+
+    """
+    dtype = DTYPES[dtype]
+    levels = np.iinfo(dtype).max
+    bad = np.isnan(data)
+    # The range is computed over the finite values only
+    finite = data[np.isfinite(data)]
+    if vmin is None: vmin = finite.min() if finite.size>0 else 0
+    if vmax is None: vmax = finite.max() if finite.size>0 else 0
+    scale = (levels - 1) / (vmax - vmin) if vmax>vmin else 0
+    values = (np.clip(data, vmin, vmax) - vmin) * scale
+    values[bad] = levels
+    return np.round(values).astype(dtype), float(vmin), float(vmax)
+
+
+# %% Cache of the html output
+def cache_path(key, cache_dir):
+    """Path of the cached html."""
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, 'd3_%s.html' %(key))
+
+
+def cache_get(key, cache_dir, path=None):
+    """Output of a cached heatmap, or None when the heatmap is not in the cache.
+
+    Parameters
+    ----------
+    key : String
+        Hash of the data and the parameters.
+    cache_dir : String
+        Directory of the cache.
+    path : String, (default: None)
+        Path of the html. The cached files are copied to this path when its content differs.
+
+    Returns
+    -------
+    dict
+        The output of the heatmap.
+
+    """
+    filepath = os.path.join(cache_dir, 'd3_%s.json' %(key))
+    if not os.path.isfile(filepath) or not os.path.isfile(cache_path(key, cache_dir)):
+        return None
+    with open(filepath, 'r') as f:
+        out = json.load(f)
+    # Mark as recently used
+    for filename in _entry(key, cache_dir):
+        os.utime(os.path.join(cache_dir, filename))
+    if path is not None:
+        out = _copy(key, cache_dir, path, out)
+    return out
+
+
+def cache_put(key, cache_dir, out, path=None, max_bytes=None):
+    """Store the output of a heatmap that is written to cache_path() and copy it to path.
+
+    Parameters
+    ----------
+    key : String
+        Hash of the data and the parameters.
+    cache_dir : String
+        Directory of the cache.
+    out : dict
+        The output of the heatmap.
+    path : String, (default: None)
+        Path of the html.
+    max_bytes : int, (default: None)
+        Maximum size of the cache in bytes. The least recently used heatmaps are removed, except for this heatmap.
+
+    Returns
+    -------
+    dict
+        The output of the heatmap.
+
+    """
+    out = {name: (list(value) if isinstance(value, tuple) else value) for name, value in out.items()}
+    with open(os.path.join(cache_dir, 'd3_%s.json' %(key)), 'w') as f:
+        json.dump(out, f)
+    if path is not None:
+        out = _copy(key, cache_dir, path, out)
+    if max_bytes is not None:
+        evict(cache_dir, 'd3_', max_bytes, keep='d3_%s' %(key))
+    return out
+
+
+def _entry(key, cache_dir):
+    return [filename for filename in os.listdir(cache_dir) if filename.split('.')[0]=='d3_%s' %(key)]
+
+
+def _copy(key, cache_dir, path, out):
+    # The html is renamed. Other files, such as the binary payload, keep the name that is referenced in the html.
+    dirpath, filename = os.path.split(path)
+    for name in _entry(key, cache_dir):
+        if name.endswith('.json'): continue
+        source = os.path.join(cache_dir, name)
+        target = path if name.endswith('.html') else os.path.join(dirpath, name)
+        if not (os.path.isfile(target) and filecmp.cmp(source, target, shallow=False)):
+            copyfile(source, target)
+    return {**out, 'filename': filename, 'dirpath': dirpath, 'path': path}
+
+
+# %% Template
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$TITLE$</title>
+<style>
+body { font-family: sans-serif; }
+#tooltip { position: absolute; pointer-events: none; background: white; border: 1px solid #999; padding: 2px 4px; font-size: 12px; display: none; }
+canvas { image-rendering: pixelated; }
+</style>
+</head>
+<body>
+<h2>$TITLE$</h2>
+<p>$DESCRIPTION$</p>
+<div style="position: relative;">
+<canvas id="heatmap"></canvas>
+<div id="tooltip"></div>
+</div>
+<script>
+var META = $META$;
+
+function decode(text) {
+  var raw = atob(text), bytes = new Uint8Array(raw.length);
+  for (var i = 0; i < raw.length; i++) bytes[i] = raw.charCodeAt(i);
+  return bytes.buffer;
+}
+
+function draw(buffer) {
+  var values = META.dtype == 'uint8' ? new Uint8Array(buffer) : new Uint16Array(buffer);
+  var nrows = META.shape[0], ncols = META.shape[1];
+  var colors = new Uint8Array(decode(META.colors));
+  var ncolors = colors.length / 4 - 1;
+  var levels = META.dtype == 'uint8' ? 255 : 65535;
+
+  // Draw the cells at the resolution of the data and scale the image to the canvas.
+  var image = document.createElement('canvas');
+  image.width = ncols;
+  image.height = nrows;
+  var context = image.getContext('2d');
+  var pixels = context.createImageData(ncols, nrows);
+  for (var i = 0; i < values.length; i++) {
+    var c = values[i] == levels ? ncolors : Math.round(values[i] * (ncolors - 1) / (levels - 1));
+    pixels.data.set(colors.subarray(4 * c, 4 * c + 4), 4 * i);
+  }
+  context.putImageData(pixels, 0, 0);
+
+  var canvas = document.getElementById('heatmap');
+  canvas.width = META.width;
+  canvas.height = META.height;
+  var ctx = canvas.getContext('2d');
+  ctx.imageSmoothingEnabled = false;
+  ctx.drawImage(image, 0, 0, META.width, META.height);
+  var background = ctx.getImageData(0, 0, META.width, META.height);
+
+  var tooltip = document.getElementById('tooltip');
+  var cw = META.width / ncols, ch = META.height / nrows;
+  canvas.addEventListener('mousemove', function(event) {
+    var col = Math.floor(event.offsetX / cw), row = Math.floor(event.offsetY / ch);
+    if (col < 0 || row < 0 || col >= ncols || row >= nrows) return;
+    var q = values[row * ncols + col];
+    var value = q == levels ? 'NaN' : (META.vmin + q * (META.vmax - META.vmin) / (levels - 1)).toPrecision(4);
+    ctx.putImageData(background, 0, 0);
+    ctx.strokeStyle = META.stroke;
+    ctx.strokeRect(col * cw, row * ch, cw, ch);
+    tooltip.style.display = 'block';
+    tooltip.style.left = (event.offsetX + 12) + 'px';
+    tooltip.style.top = (event.offsetY + 12) + 'px';
+    tooltip.textContent = META.rows[row] + ' / ' + META.cols[col] + ': ' + value;
+  });
+  canvas.addEventListener('mouseleave', function() {
+    ctx.putImageData(background, 0, 0);
+    tooltip.style.display = 'none';
+  });
+}
+
+if (META.data !== undefined) {
+  draw(decode(META.data));
+} else {
+  fetch(META.src).then(function(response) { return response.arrayBuffer(); }).then(draw);
+}
+</script>
+</body>
+</html>
+"""
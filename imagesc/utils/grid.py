@@ -0,0 +1,88 @@
+""" Grid lines between the cells of a heatmap."""
+# --------------------------------------------------------------------------
+# Name        : grid.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from matplotlib.collections import LineCollection
+import numpy as np
+
+# Minimum size of a cell in pixels of the figure to draw the grid.
+MIN_PIXELS = 4
+# Number of lines above which the grid is rasterized in vector formats, such as pdf and svg.
+RASTER_LINES = 1000
+
+
+# %% Grid lines
+def gridlines(ax, shape, offset=-0.5, block=(1, 1), color='#000000', linewidth=0.1, rasterized=None):
+    """Draw the borders of all cells as a single LineCollection.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes of the heatmap.
+    shape : tuple
+        Shape (rows, columns) of the data.
+    offset : float, (default: -0.5)
+        Position of the first border in data coordinates.
+    block : tuple, (default: (1, 1))
+        Size (rows, columns) of a cell in data coordinates, such as the block size of reduced data.
+    color : color, (default: '#000000')
+        Color of the lines.
+    linewidth : float, (default: 0.1)
+        Width of the lines in points.
+    rasterized : Bool, (default: None)
+        Rasterize the lines in vector formats. None rasterizes when there are more than RASTER_LINES lines.
+
+    Returns
+    -------
+    matplotlib.collections.LineCollection
+        The grid lines. The lines span the limits of the axes.
+
+    """
+    xlim, ylim = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+    x = np.arange(shape[1] + 1) * block[1] + offset
+    y = np.arange(shape[0] + 1) * block[0] + offset
+    # Segments of shape (lines, 2 points, xy)
+    vertical = np.empty((len(x), 2, 2))
+    vertical[:, :, 0] = x[:, None]
+    vertical[:, :, 1] = ylim
+    horizontal = np.empty((len(y), 2, 2))
+    horizontal[:, :, 0] = xlim
+    horizontal[:, :, 1] = y[:, None]
+
+    lines = LineCollection(np.concatenate([vertical, horizontal]), colors=color, linewidths=linewidth, linestyles='solid')
+    if rasterized is None:
+        rasterized = (len(x) + len(y))>RASTER_LINES
+    lines.set_rasterized(rasterized)
+    ax.add_collection(lines, autolim=False)
+    return lines
+
+
+# %% Check
+def visible(shape, linewidth, figsize, dpi):
+    """Check whether grid lines can be seen between the cells.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape (rows, columns) of the data.
+    linewidth : float
+        Width of the lines in points.
+    figsize : tuple
+        Size (width, height) of the figure in inches.
+    dpi : int
+        Dots per inch of the figure.
+
+    Returns
+    -------
+    Bool
+        True when the cells are at least MIN_PIXELS in size and the lines cover less than half of a cell.
+
+    """
+    # Size of a cell in pixels of the figure
+    pixels = min(figsize[1] * dpi / max(shape[0], 1), figsize[0] * dpi / max(shape[1], 1))
+    return (pixels>=MIN_PIXELS) and (linewidth * dpi / 72 < pixels / 2)
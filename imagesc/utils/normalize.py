@@ -0,0 +1,97 @@
+""" Normalization of the data before creating the heatmap."""
+# --------------------------------------------------------------------------
+# Name        : normalize.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+import numpy as np
+import warnings
+
+METHODS = ['global', 'row', 'column', 'zscore', 'robust', 'log']
+
+
+# %% Normalize
+def normalize(data, method='global', out=None, inplace=False, percentiles=(1, 99), stats=None):
+    """Normalize the data.
+
+    Floating point data keeps its dtype, so float32 input results in float32 output.
+    Other dtypes are converted into float64. Only a single output array is allocated,
+    or none when the normalization is performed in-place.
+
+    Parameters
+    ----------
+    data : numpy array
+        data array.
+    method : String, (default: 'global')
+        Normalization method. Missing values (NaN) are ignored when computing the statistics.
+            * 'global' : (x - mean) / (max - min)
+            * 'row' : Scale each row between [0, 1]. This is equal to standard_scale=0 in seaborn.
+            * 'column' : Scale each column between [0, 1]. This is equal to standard_scale=1 in seaborn.
+            * 'zscore' : (x - mean) / std
+            * 'robust' : (x - median) / (x[percentiles[1]] - x[percentiles[0]])
+            * 'log' : log(1 + x - min)
+    out : numpy array, (default: None)
+        Array with the same shape as data to write the results to.
+    inplace : Bool, (default: False)
+        Write the results into data. Requires floating point data.
+    percentiles : tuple, (default: (1, 99))
+        Lower and upper percentile that are used for the 'robust' method.
+    stats : dict, (default: None)
+        Precomputed 'min', 'max' and 'mean' for the 'global' method, e.g. computed on out-of-core data.
+
+    Returns
+    -------
+    numpy array
+        Normalized data.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> X = np.random.rand(10, 20).astype(np.float32)
+    >>> Xnorm = imagesc.normalize(X, method='zscore')
+    >>> imagesc.normalize(X, method='row', inplace=True)
+
+    """
+    if method is True: method = 'global'
+    if method not in METHODS:
+        raise ValueError('[imagesc] >method should be one of %s' %(METHODS))
+
+    data = np.asarray(data)
+    if inplace:
+        if not np.issubdtype(data.dtype, np.floating):
+            raise ValueError('[imagesc] >In-place normalization requires floating point data.')
+        out = data
+    elif out is None:
+        out = np.empty(data.shape, dtype=data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64)
+
+    with warnings.catch_warnings():
+        # Rows or columns that only contain NaN remain NaN
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        if method=='global':
+            if stats is None:
+                stats = {'min': np.nanmin(data), 'max': np.nanmax(data), 'mean': np.nanmean(data, dtype=np.float64)}
+            offset, scale = stats['mean'], stats['max'] - stats['min']
+        elif method=='row' or method=='column':
+            axis = 1 if method=='row' else 0
+            offset = np.nanmin(data, axis=axis, keepdims=True)
+            scale = np.nanmax(data, axis=axis, keepdims=True) - offset
+        elif method=='zscore':
+            offset, scale = np.nanmean(data, dtype=np.float64), np.nanstd(data, dtype=np.float64)
+        elif method=='robust':
+            low, offset, high = np.nanpercentile(data, [percentiles[0], 50, percentiles[1]])
+            scale = high - low
+        elif method=='log':
+            offset, scale = np.nanmin(data), 1
+
+    # Prevent division by zero for constant data
+    scale = np.where(scale==0, 1, scale)
+    np.subtract(data, offset, out=out)
+    if method=='log':
+        np.log1p(out, out=out)
+    else:
+        np.divide(out, scale, out=out)
+    return out
@@ -0,0 +1,188 @@
+""" Hierarchical clustering to order the rows and columns of a heatmap."""
+# --------------------------------------------------------------------------
+# Name        : ordering.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc.utils.cache import LRUCache, hash_key
+from imagesc.utils.profile import profiled
+import numpy as np
+import importlib.util
+import os
+
+# Above this number of rows, the exact linkage is replaced by a memory-efficient method.
+EXACT_MAX = 5000
+# Number of rows for which the distances to the samples are computed at once.
+CHUNK_ROWS = 4096
+# Orderings of recently clustered data.
+_CACHE = LRUCache(maxsize=32)
+
+
+# %% Cluster order
+@profiled
+def cluster_order(data, linkage='ward', distance='euclidean', method='auto', optimal_ordering=False, max_samples=2000, random_state=None, cache=True, cache_dir=None, verbose=3):
+    """Order the rows and columns using hierarchical clustering.
+
+    Parameters
+    ----------
+    data : numpy array
+        data array.
+    linkage : String, (default: 'ward')
+        Linkage method, such as 'ward', 'single', 'complete', 'average'.
+    distance : String, (default: 'euclidean')
+        Distance metric, such as 'euclidean', 'cityblock', 'cosine', 'correlation'.
+    method : String, (default: 'auto')
+        Clustering method.
+            * 'auto' : 'exact' up to 5000 rows, 'vector' when fastcluster is installed, and 'sample' otherwise.
+            * 'exact' : scipy linkage on the full condensed distance matrix. Memory is O(n^2).
+            * 'vector' : fastcluster.linkage_vector that uses the nearest-neighbor-chain on the feature vectors. Memory is O(n).
+            * 'sample' : Cluster a random sample and assign the remaining rows to their nearest sample. No linkage is returned.
+    optimal_ordering : Bool, (default: False)
+        Reorder the leaves such that the distance between successive leaves is minimal. This requires the full distance matrix.
+    max_samples : int, (default: 2000)
+        Number of rows that is clustered for the 'sample' method.
+    random_state : int, (default: None)
+        Seed for the 'sample' method.
+    cache : Bool, (default: True)
+        Reuse the orderings of data that was clustered before with the same parameters.
+        The key is the hash of the data, including any scaling, and the parameters.
+    cache_dir : String, (default: None)
+        Directory to store the orderings on disk. None only keeps the orderings in memory.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        'row' : ordering of the rows.
+        'col' : ordering of the columns.
+        'row_linkage' : linkage matrix of the rows or None.
+        'col_linkage' : linkage matrix of the columns or None.
+        The arrays are read-only as they are shared with the cache.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> X = np.random.rand(100, 20)
+    >>> order = imagesc.cluster_order(X)
+    >>> fig = imagesc.cluster(X, order=order)
+    >>> fig = imagesc.cluster(X, order=order, cmap='rainbow')
+
+    """
+    data = np.asarray(data, dtype=np.float64)
+    key = None
+    if cache:
+        key = hash_key(data, linkage, distance, method, optimal_ordering, max_samples, random_state)
+        order = _cache_get(key, cache_dir)
+        if order is not None:
+            if verbose>=4: print('[imagesc] >Orderings are retrieved from cache.')
+            return dict(order)
+
+    row, row_linkage = _order(data, linkage, distance, method, optimal_ordering, max_samples, random_state, verbose)
+    col, col_linkage = _order(data.T, linkage, distance, method, optimal_ordering, max_samples, random_state, verbose)
+    order = {'row': row, 'col': col, 'row_linkage': row_linkage, 'col_linkage': col_linkage}
+
+    if cache: _cache_put(key, order, cache_dir)
+    return dict(order)
+
+
+# %% Clear cache
+def clear_cache(cache_dir=None):
+    """Remove the cached orderings from memory, and from disk when cache_dir is given."""
+    _CACHE.clear()
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        for filename in os.listdir(cache_dir):
+            if filename.startswith('order_') and filename.endswith('.npz'):
+                os.remove(os.path.join(cache_dir, filename))
+
+
+def _cache_get(key, cache_dir):
+    order = _CACHE.get(key)
+    if order is None and cache_dir is not None:
+        filepath = os.path.join(cache_dir, 'order_%s.npz' %(key))
+        if os.path.isfile(filepath):
+            with np.load(filepath) as f:
+                # Empty linkage matrices are stored for the sample method.
+                order = {name: (f[name] if f[name].size>0 or not name.endswith('linkage') else None) for name in f.files}
+            _cache_put(key, order, None)
+    return order
+
+
+def _cache_put(key, order, cache_dir):
+    # The arrays are shared by all callers that retrieve the ordering, so they cannot be changed in place.
+    for value in order.values():
+        if value is not None: value.setflags(write=False)
+    _CACHE.put(key, order)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        filepath = os.path.join(cache_dir, 'order_%s.npz' %(key))
+        np.savez(filepath, **{name: (value if value is not None else np.empty((0, 4))) for name, value in order.items()})
+
+
+# %% Order of a single axis
+def _order(X, linkage, distance, method, optimal_ordering, max_samples, random_state, verbose):
+    from scipy.cluster import hierarchy
+    n = X.shape[0]
+    if n<=2:
+        return np.arange(n), None
+
+    if method=='auto':
+        if n<=EXACT_MAX:
+            method = 'exact'
+        else:
+            method = 'vector' if _has_fastcluster() else 'sample'
+    if method=='vector' and not _has_fastcluster():
+        if verbose>=2: print('[imagesc] >Warning: fastcluster is missing, the "sample" method is used instead. Try to: pip install imagesc[fast]')
+        method = 'sample'
+    if verbose>=4: print('[imagesc] >Clustering %d rows using the %s method.' %(n, method))
+
+    if method=='exact':
+        Z = hierarchy.linkage(X, method=linkage, metric=distance, optimal_ordering=optimal_ordering)
+    elif method=='vector':
+        import fastcluster
+        Z = fastcluster.linkage_vector(X, method=linkage, metric=distance)
+        if optimal_ordering:
+            Z = hierarchy.optimal_leaf_ordering(Z, X, metric=distance)
+    elif method=='sample':
+        return _order_sample(X, linkage, distance, optimal_ordering, max_samples, random_state), None
+    else:
+        raise ValueError('[imagesc] >method should be one of %s' %(['auto', 'exact', 'vector', 'sample']))
+
+    return hierarchy.leaves_list(Z), Z
+
+
+# %% Order based on a sample
+def _order_sample(X, linkage, distance, optimal_ordering, max_samples, random_state):
+    from scipy.cluster import hierarchy
+    from scipy.spatial.distance import cdist
+    n = X.shape[0]
+    if n<=max_samples:
+        return hierarchy.leaves_list(hierarchy.linkage(X, method=linkage, metric=distance, optimal_ordering=optimal_ordering))
+
+    rng = np.random.default_rng(random_state)
+    samples = np.sort(rng.choice(n, size=max_samples, replace=False))
+    Z = hierarchy.linkage(X[samples], method=linkage, metric=distance, optimal_ordering=optimal_ordering)
+    # Position of each sample in the ordering
+    rank = np.empty(max_samples, dtype=np.intp)
+    rank[hierarchy.leaves_list(Z)] = np.arange(max_samples)
+
+    # Assign every row to the nearest sample in chunks to limit the memory
+    nearest = np.empty(n, dtype=np.intp)
+    dist = np.empty(n, dtype=np.float64)
+    # Ward, centroid and median are defined for euclidean distances
+    metric = 'euclidean' if linkage in ['ward', 'centroid', 'median'] else distance
+    for start in range(0, n, CHUNK_ROWS):
+        D = cdist(X[start:start + CHUNK_ROWS], X[samples], metric=metric)
+        nearest[start:start + CHUNK_ROWS] = np.argmin(D, axis=1)
+        dist[start:start + CHUNK_ROWS] = D[np.arange(D.shape[0]), nearest[start:start + CHUNK_ROWS]]
+
+    # Order by the position of the nearest sample, and within a sample by the distance to it.
+    return np.lexsort((dist, rank[nearest]))
+
+
+def _has_fastcluster():
+    return importlib.util.find_spec('fastcluster') is not None
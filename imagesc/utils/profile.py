@@ -0,0 +1,179 @@
+""" Timing of the stages of the heatmap functions."""
+# --------------------------------------------------------------------------
+# Name        : profile.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+import contextlib
+import functools
+import threading
+import tracemalloc
+import time
+import json
+import os
+
+# Profilers that are recording. Stages are not timed when this is empty.
+_ACTIVE = []
+_NULL = contextlib.nullcontext()
+
+
+# %% Profiler
+class Profiler:
+    """Record the duration of the stages of all heatmap functions that are called in its context.
+
+    The stages are nested, such as 'fast' > 'normalize'. Without an active profiler, the stages
+    are not recorded and cost a single check.
+
+    Parameters
+    ----------
+    memory : Bool, (default: False)
+        Record the memory that is allocated by each stage using tracemalloc. This slows down the functions.
+    callback : function, (default: None)
+        Function that is called with the event of every stage when the stage is finished.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> with imagesc.Profiler(memory=True) as profiler:
+    >>>     imagesc.render(np.random.rand(100, 100), kind='plot', filepath='heatmap.png')
+    >>> profiler.to_dict()['stages']
+    >>> profiler.to_chrome_trace('trace.json')
+
+    """
+
+    def __init__(self, memory=False, callback=None):
+        self.memory = memory
+        self.callback = callback
+        self.events = []
+        self._open = threading.local()
+        self._tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._start = time.perf_counter()
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _ACTIVE.remove(self)
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return False
+
+    def _stack(self):
+        if not hasattr(self._open, 'stack'):
+            self._open.stack = []
+        return self._open.stack
+
+    def _begin(self, name):
+        stack = self._stack()
+        event = {'name': name, 'depth': len(stack), 'start': time.perf_counter() - self._start, 'thread': threading.get_ident()}
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak of the enclosing stage is kept before the peak is reset for this stage
+            if len(stack)>0: stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+            tracemalloc.reset_peak()
+            event['_current'], event['_peak'] = current, current
+        stack.append(event)
+
+    def _end(self):
+        event = self._stack().pop()
+        event['duration'] = time.perf_counter() - self._start - event['start']
+        if '_current' in event:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(event.pop('_peak'), peak)
+            start = event.pop('_current')
+            # Memory that remains allocated and the maximum that was allocated during the stage
+            event['allocated'] = current - start
+            event['peak'] = peak - start
+            stack = self._stack()
+            if len(stack)>0: stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        self.events.append(event)
+        if self.callback is not None: self.callback(event)
+
+    def to_dict(self):
+        """Recorded stages.
+
+        Returns
+        -------
+        dict
+            'events' : list with 'name', 'depth', 'start' and 'duration' in seconds, and 'allocated' and 'peak' in bytes when memory is recorded.
+            'stages' : total 'time', 'count' and maximum 'peak' of each stage name.
+
+        """
+        stages = {}
+        for event in self.events:
+            stage = stages.setdefault(event['name'], {'count': 0, 'time': 0.0})
+            stage['count'] += 1
+            stage['time'] += event['duration']
+            if 'peak' in event:
+                stage['peak'] = max(stage.get('peak', 0), event['peak'])
+        return {'events': sorted(self.events, key=lambda event: event['start']), 'stages': stages}
+
+    def to_chrome_trace(self, filepath=None):
+        """Recorded stages in the Trace Event Format of chrome://tracing and Perfetto.
+
+        Parameters
+        ----------
+        filepath : String, (default: None)
+            Write the trace to this JSON file.
+
+        Returns
+        -------
+        dict
+            The trace.
+
+        """
+        trace = {'traceEvents': [], 'displayTimeUnit': 'ms'}
+        for event in self.to_dict()['events']:
+            trace['traceEvents'].append({'name': event['name'], 'cat': 'imagesc', 'ph': 'X', 'pid': os.getpid(), 'tid': event['thread'],
+                                         'ts': event['start'] * 1e6, 'dur': event['duration'] * 1e6,
+                                         'args': {name: event[name] for name in ['allocated', 'peak'] if name in event}})
+        if filepath is not None:
+            with open(filepath, 'w') as f:
+                json.dump(trace, f)
+        return trace
+
+
+# %% Stages
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.profilers = list(_ACTIVE)
+
+    def __enter__(self):
+        for profiler in self.profilers:
+            profiler._begin(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        for profiler in reversed(self.profilers):
+            profiler._end()
+        return False
+
+
+def stage(name):
+    """Context manager that records the duration of a stage when a Profiler is active."""
+    if len(_ACTIVE)==0:
+        return _NULL
+    return _Stage(name)
+
+
+def profiled(func):
+    """Record the function as a stage when a Profiler is active. Leading underscores are removed from the name."""
+    name = func.__name__.lstrip('_')
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if len(_ACTIVE)==0:
+            return func(*args, **kwargs)
+        with _Stage(name):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,201 @@
+""" Direct-to-PNG rasterization of heatmaps without creating a matplotlib figure."""
+# --------------------------------------------------------------------------
+# Name        : raster.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc.utils.cache import LRUCache
+import numpy as np
+import struct
+import zlib
+import os
+
+# Colormaps and lookup tables that are recently used.
+_COLORMAPS = LRUCache(maxsize=64)
+
+
+# %% Colormap lookup table
+def colormap(cmap='coolwarm', N=None, bad=None, over=None, under=None):
+    """Colormap with the number of colors and the colors of the extremes.
+
+    The colormaps are cached, together with their lookup tables, so that all
+    heatmap functions and batch jobs use the same colors without resolving the colormap again.
+
+    Parameters
+    ----------
+    cmap : String or matplotlib Colormap, (default: 'coolwarm')
+        Name of the colormap.
+    N : int, (default: None)
+        Number of colors, such as 256 or 4096. None uses the number of colors of the colormap.
+    bad : color, (default: None)
+        Color of missing values (NaN). None uses the color of the colormap.
+    over : color, (default: None)
+        Color of values above vmax. None uses the color of the colormap.
+    under : color, (default: None)
+        Color of values below vmin. None uses the color of the colormap.
+
+    Returns
+    -------
+    matplotlib Colormap
+        Other input, such as None or a list of colors, is returned as is.
+
+    """
+    entry = _resolve(cmap, N, bad, over, under)
+    return cmap if entry is None else entry[0]
+
+
+def lut(cmap='coolwarm', N=None, bad=None, over=None, under=None):
+    """Lookup table with the RGBA values of a colormap.
+
+    The table follows the layout of matplotlib: the first N entries are the
+    colormap, followed by the under, over and bad colors. The table is cached and read-only.
+
+    Parameters
+    ----------
+    cmap : String or matplotlib Colormap, (default: 'coolwarm')
+        Name of the colormap.
+    N, bad, over, under
+        See colormap().
+
+    Returns
+    -------
+    numpy array
+        uint8 array of shape (N + 3, 4).
+
+    """
+    entry = _resolve(cmap, N, bad, over, under)
+    if entry is None:
+        raise ValueError('[imagesc] >cmap should be the name of a colormap or a matplotlib Colormap.')
+    return entry[1]
+
+
+def _resolve(cmap, N, bad, over, under):
+    # Only the colormap registry is required. Pyplot and its figure manager are never loaded.
+    import matplotlib
+    if not isinstance(cmap, (str, matplotlib.colors.Colormap)):
+        return None
+    extremes = {name: matplotlib.colors.to_rgba(color) for name, color in [('bad', bad), ('over', over), ('under', under)] if color is not None}
+    # Colormap objects are not hashable. The entry keeps a reference to the object so that its id is not reused.
+    key = (cmap if isinstance(cmap, str) else id(cmap), N, tuple(sorted(extremes.items())))
+    entry = _COLORMAPS.get(key)
+    if entry is not None:
+        return entry
+
+    resolved = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap
+    if N is not None and N!=resolved.N:
+        resolved = resolved.resampled(N)
+    if len(extremes)>0:
+        resolved = resolved.with_extremes(**extremes)
+    table = np.zeros((resolved.N + 3, 4), dtype=np.uint8)
+    table[:resolved.N] = resolved(np.arange(resolved.N), bytes=True)
+    table[resolved.N] = resolved(-np.inf, bytes=True)
+    table[resolved.N + 1] = resolved(np.inf, bytes=True)
+    table[resolved.N + 2] = resolved(np.nan, bytes=True)
+    table.flags.writeable = False
+
+    entry = (resolved, table, cmap)
+    _COLORMAPS.put(key, entry)
+    # The resolved colormap is passed to the renderers, and maps to the same table.
+    _COLORMAPS.put((id(resolved), None, ()), entry)
+    return entry
+
+
+# %% Map data to colors
+def to_rgba(data, cmap='coolwarm', vmin=None, vmax=None):
+    """Convert a 2D array into RGBA pixels using the colormap.
+
+    Parameters
+    ----------
+    data : numpy array
+        2D data array. Arrays of shape (N, M, 3) or (N, M, 4) are considered to be images and are used as is.
+    cmap : String or matplotlib Colormap, (default: 'coolwarm')
+        Name of the colormap, see colormap().
+    vmin : float, (default: None)
+        Minimum of the color range. None uses the minimum value in the data.
+    vmax : float, (default: None)
+        Maximum of the color range. None uses the maximum value in the data.
+
+    Returns
+    -------
+    numpy array
+        uint8 array of shape (N, M, 4).
+
+    """
+    data = np.asarray(data)
+    # Images are directly converted into RGBA
+    if data.ndim==3 and data.shape[2] in [3, 4]:
+        if data.dtype!=np.uint8:
+            data = (np.clip(data, 0, 1) * 255 + 0.5).astype(np.uint8)
+        if data.shape[2]==3:
+            data = np.concatenate([data, np.full(data.shape[:2] + (1,), 255, dtype=np.uint8)], axis=2)
+        return data
+
+    table = lut(cmap)
+    N = table.shape[0] - 3
+    # Infinite values are mapped to the under and over colors, like matplotlib
+    bad = np.isnan(data)
+    # Use the same autoscaling as matplotlib.colors.Normalize
+    if (vmin is None) or (vmax is None):
+        finite = data[np.isfinite(data)]
+        if vmin is None: vmin = finite.min() if finite.size>0 else 0
+        if vmax is None: vmax = finite.max() if finite.size>0 else 0
+
+    if vmin==vmax:
+        xa = np.zeros(data.shape, dtype=float)
+    else:
+        xa = (data - vmin) * (N / (vmax - vmin))
+    xa[xa==N] = N - 1
+    under = xa < 0
+    over = xa >= N
+    # Clip before casting to prevent overflow of the integer indexes
+    xa[bad] = 0
+    idx = np.clip(xa, -1, N, out=xa).astype(np.intp)
+    idx[under] = N
+    idx[over] = N + 1
+    idx[bad] = N + 2
+    return table.take(idx, axis=0)
+
+
+# %% Write PNG
+def to_png(rgba, filepath=None):
+    """Encode RGBA pixels into PNG.
+
+    Parameters
+    ----------
+    rgba : numpy array
+        uint8 array of shape (N, M, 4).
+    filepath : String, (default: None)
+        Write the PNG to this path. Nothing is written when None.
+
+    Returns
+    -------
+    bytes
+        The PNG file content.
+
+    """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    height, width = rgba.shape[0], rgba.shape[1]
+    # Every scanline starts with filter type 0 (None)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def _chunk(tag, content):
+        return struct.pack('>I', len(content)) + tag + content + struct.pack('>I', zlib.crc32(tag + content) & 0xffffffff)
+
+    png = b''.join([b'\x89PNG\r\n\x1a\n',
+                    _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+                    _chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)),
+                    _chunk(b'IEND', b''),
+                    ])
+
+    if filepath is not None:
+        dirpath = os.path.dirname(filepath)
+        if dirpath!='' and not os.path.isdir(dirpath):
+            os.makedirs(dirpath, exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(png)
+
+    return png
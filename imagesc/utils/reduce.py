@@ -0,0 +1,258 @@
+""" Reduce large matrices to the pixel grid of the output figure.
+
+Besides numpy arrays, the functions accept out-of-core data such as np.memmap,
+paths to .npy files and chunked arrays (h5py, zarr) that support slicing. The
+data is processed in bands of rows so that the full matrix is never loaded.
+scipy.sparse matrices are reduced from their non-zero entries without creating
+the dense matrix.
+"""
+# --------------------------------------------------------------------------
+# Name        : reduce.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+import numpy as np
+import warnings
+import os
+
+AGGREGATE = {'mean': np.nanmean, 'max': np.nanmax, 'min': np.nanmin}
+# Number of bytes that is read at once from out-of-core data.
+BAND_BYTES = 64 * 1024**2
+
+
+# %% Load
+def load(data):
+    """Prepare the input data for reading.
+
+    Parameters
+    ----------
+    data : array-like
+        numpy array, np.memmap, path to a .npy file, scipy.sparse matrix, or a chunked array (h5py, zarr)
+        with the attributes shape and dtype that supports slicing.
+
+    Returns
+    -------
+    array-like
+        .npy files are memory-mapped. Sparse and chunked arrays are returned as is and lists are converted to numpy arrays.
+
+    """
+    if isinstance(data, (str, os.PathLike)):
+        if not str(data).endswith('.npy'):
+            raise ValueError('[imagesc] >path should contain the file extension: ".npy"')
+        return np.load(data, mmap_mode='r')
+    if isinstance(data, np.ndarray) or issparse(data) or (hasattr(data, 'shape') and hasattr(data, 'dtype') and hasattr(data, '__getitem__')):
+        return data
+    return np.asarray(data)
+
+
+# %% Sparse
+def issparse(data):
+    """Check whether the data is a scipy.sparse matrix or array without importing scipy."""
+    return hasattr(data, 'tocoo') and hasattr(data, 'nnz')
+
+
+def todense(data):
+    """Load the data in memory as a numpy array."""
+    if issparse(data):
+        return data.toarray()
+    return data if isinstance(data, np.ndarray) else np.asarray(data[:])
+
+
+def _coo(data):
+    # Non-zero entries without duplicates
+    coo = data.tocoo()
+    if not coo.has_canonical_format:
+        coo = coo.copy()
+        coo.sum_duplicates()
+    return coo
+
+
+# %% Bands
+def bands(data, multiple=1):
+    """Iterate over bands of rows as numpy arrays.
+
+    Parameters
+    ----------
+    data : array-like
+        Data that supports slicing.
+    multiple : int, (default: 1)
+        The number of rows in each band is a multiple of this number.
+
+    Yields
+    ------
+    numpy array
+        A band of rows.
+
+    """
+    rowbytes = max(int(np.prod(data.shape[1:])) * np.dtype(data.dtype).itemsize, 1)
+    rows = max(BAND_BYTES // (rowbytes * multiple), 1) * multiple
+    for start in range(0, data.shape[0], rows):
+        yield np.asarray(data[start:start + rows])
+
+
+# %% Statistics
+def stats(data):
+    """Minimum, maximum and mean of the data computed in bands of rows.
+
+    Parameters
+    ----------
+    data : array-like
+        Data that supports slicing. Missing values (NaN) are ignored.
+
+    Returns
+    -------
+    dict
+        'min', 'max' and 'mean'.
+
+    """
+    if issparse(data):
+        return _stats_sparse(data)
+    vmin, vmax, total, count = np.inf, -np.inf, 0.0, 0
+    for band in bands(data):
+        band = band.astype(np.float64, copy=False)
+        finite = ~np.isnan(band)
+        n = int(np.count_nonzero(finite))
+        if n==0: continue
+        vmin = min(vmin, np.nanmin(band))
+        vmax = max(vmax, np.nanmax(band))
+        total += np.nansum(band)
+        count += n
+
+    if count==0:
+        return {'min': np.nan, 'max': np.nan, 'mean': np.nan}
+    return {'min': vmin, 'max': vmax, 'mean': total / count}
+
+
+def _stats_sparse(data):
+    # The implicit zeros are part of the statistics
+    # Duplicate entries are summed first, so the number of entries is taken after summing
+    coo = _coo(data)
+    values = coo.data.astype(np.float64, copy=False)
+    values = values[~np.isnan(values)]
+    zeros = data.shape[0] * data.shape[1] - coo.nnz
+    count = len(values) + zeros
+    if count==0:
+        return {'min': np.nan, 'max': np.nan, 'mean': np.nan}
+    if zeros>0: values = np.r_[values, 0.0]
+    vmin, vmax = values.min(), values.max()
+    return {'min': vmin, 'max': vmax, 'mean': values.sum() / count}
+
+
+# %% Block size
+def blocksize(data_shape, pixels):
+    """Number of rows and columns that are aggregated into one pixel.
+
+    Parameters
+    ----------
+    data_shape : tuple
+        Shape of the data (rows, columns).
+    pixels : tuple
+        Available pixels (rows, columns).
+
+    Returns
+    -------
+    tuple
+        Block size (rows, columns). (1, 1) means that no reduction is required.
+
+    """
+    return (max(int(np.ceil(data_shape[0] / max(pixels[0], 1))), 1),
+            max(int(np.ceil(data_shape[1] / max(pixels[1], 1))), 1))
+
+
+# %% Downsample
+def downsample(data, block, method='mean'):
+    """Aggregate blocks of cells into a single cell.
+
+    Parameters
+    ----------
+    data : array-like
+        Array of shape (N, M) or images of shape (N, M, channels). Out-of-core data is read in bands of rows, see load().
+        scipy.sparse matrices are aggregated from the non-zero entries in O(nnz).
+    block : tuple
+        Number of rows and columns that are aggregated, see blocksize().
+    method : String, (default: 'mean')
+        Aggregation method. Missing values (NaN) are ignored.
+            * 'mean'
+            * 'max'
+            * 'min'
+
+    Returns
+    -------
+    numpy array
+        Array of shape (ceil(N / block[0]), ceil(M / block[1])).
+
+    """
+    if method not in AGGREGATE:
+        raise ValueError('[imagesc] >method should be one of %s' %(list(AGGREGATE.keys())))
+    if block==(1, 1):
+        return todense(data)
+    if issparse(data):
+        return _downsample_sparse(data, block, method)
+    # Every band contains complete blocks of rows. This limits the size of the
+    # temporary arrays and reads out-of-core data only once.
+    return np.concatenate([_downsample(band, block, method) for band in bands(data, multiple=block[0])], axis=0)
+
+
+def _downsample(data, block, method):
+    br, bc = block
+    # Integer images (N, M, channels) are returned in their own dtype to keep the color range.
+    image_dtype = data.dtype if data.ndim==3 and np.issubdtype(data.dtype, np.integer) else None
+    nr, nc = int(np.ceil(data.shape[0] / br)), int(np.ceil(data.shape[1] / bc))
+    dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+    # Pad with NaN when the shape is not a multiple of the block size
+    if (nr * br, nc * bc)!=data.shape[:2]:
+        padded = np.full((nr * br, nc * bc) + data.shape[2:], np.nan, dtype=dtype)
+        padded[:data.shape[0], :data.shape[1]] = data
+        data = padded
+    # Strided view of shape (nr, br, nc, bc, ...) without copying the data
+    data = data.reshape((nr, br, nc, bc) + data.shape[2:])
+
+    with warnings.catch_warnings():
+        # Blocks that only contain NaN remain NaN
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        out = AGGREGATE[method](data, axis=(1, 3))
+    if image_dtype is not None:
+        return np.round(out).astype(image_dtype)
+    return out.astype(dtype, copy=False)
+
+
+def _downsample_sparse(data, block, method):
+    br, bc = block
+    nr, nc = int(np.ceil(data.shape[0] / br)), int(np.ceil(data.shape[1] / bc))
+    dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+    coo = _coo(data)
+    values = coo.data.astype(np.float64, copy=False)
+    finite = ~np.isnan(values)
+    # Every non-zero entry is binned into the cell of its block
+    cell = (coo.row // br) * nc + (coo.col // bc)
+    # Number of cells in each block. Blocks at the edges can be smaller.
+    rows = np.minimum(br, data.shape[0] - np.arange(nr) * br)
+    cols = np.minimum(bc, data.shape[1] - np.arange(nc) * bc)
+    size = np.outer(rows, cols).ravel()
+    zeros = size - np.bincount(cell, minlength=nr * nc)
+    count = np.bincount(cell[finite], minlength=nr * nc) + zeros
+
+    if method=='mean':
+        total = np.bincount(cell[finite], weights=values[finite], minlength=nr * nc)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = total / count
+    else:
+        ufunc, init = (np.maximum, -np.inf) if method=='max' else (np.minimum, np.inf)
+        out = np.full(nr * nc, init)
+        ufunc.at(out, cell[finite], values[finite])
+        # The implicit zeros take part in the aggregation
+        out = np.where(zeros>0, ufunc(out, 0), out)
+    # Blocks that only contain NaN remain NaN
+    out[count==0] = np.nan
+    return out.reshape(nr, nc).astype(dtype, copy=False)
+
+
+# %% Labels
+def downsample_labels(labels, block):
+    """Keep the label of the first row or column of each block."""
+    if labels is None or block==1:
+        return labels
+    return np.asarray(labels)[::block]
@@ -0,0 +1,156 @@
+""" Re-rendering of heatmaps with a fixed shape."""
+# --------------------------------------------------------------------------
+# Name        : renderer.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc import imagesc as _imagesc
+from imagesc.utils import reduce
+from imagesc.utils.profile import profiled
+import numpy as np
+
+
+# %% Heatmap renderer
+class HeatmapRenderer:
+    """Heatmap of which only the data is replaced.
+
+    The figure, axes, tick labels, grid and colorbar are created once with the layout of fast().
+    Every update only replaces the image data and redraws the image on top of the stored background (blitting).
+    By default, the color range is fixed: vmin and vmax are used when given, otherwise the range of the first frame
+    with finite values is used for all frames. Set vmin and vmax to cover the range of the full stream, as values
+    outside the range are clipped to the end colors. With clim='frame', the range follows every frame and the
+    background with the colorbar is drawn again when the range changes, which is slower.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape (rows, columns) of the data.
+    row_labels : List
+        A list or array of length N with the labels for the rows.
+    col_labels : List
+        A list or array of length M with the labels for the columns.
+    clim : String, (default: 'first')
+        Color range when vmin or vmax is not given.
+            * 'first' : The range of the first frame with finite values is used for all frames.
+            * 'frame' : The range of every frame is used.
+    **args
+        Arguments of fast(), such as cmap, vmin, vmax, normalize, reduce, figsize, dpi and show.
+        Annotations (annot) are not supported.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> renderer = imagesc.HeatmapRenderer((100, 100), vmin=0, vmax=1, show=False)
+    >>> for i in range(100):
+    >>>     renderer.update(np.random.rand(100, 100))
+    >>>     rgba = renderer.buffer()
+
+    """
+
+    def __init__(self, shape, row_labels=None, col_labels=None, clim='first', **args):
+        if clim not in ['first', 'frame']: raise ValueError('[imagesc] >clim should be one of [\'first\', \'frame\'].')
+        args, args_im = _imagesc._defaults(args)
+        self.shape = tuple(shape[:2])
+        self.args, self.args_im = args, args_im
+        # Block size to reduce the data to the pixel grid of the figure
+        self.block = (1, 1) if args_im['reduce'] is None else _imagesc._blocksize(self.shape, args_im)
+        row_labels = reduce.downsample_labels(row_labels, self.block[0])
+        col_labels = reduce.downsample_labels(col_labels, self.block[1])
+
+        # Layout of fast() with an empty image
+        data = np.full((int(np.ceil(self.shape[0] / self.block[0])), int(np.ceil(self.shape[1] / self.block[1]))), np.nan)
+        args['linewidth'] = _imagesc._check_input(data, args['linewidth'], args_im)
+        self.fig, self.ax = _imagesc._subplots(args_im)
+        self.image = _imagesc._fast_layout(self.ax, data, row_labels, col_labels, args, args_im)
+        # The image is not part of the background
+        self.image.set_animated(True)
+        self._background = None
+        self._clim = None
+        self.clim = clim
+
+    @profiled
+    def update(self, data):
+        """Replace the data and redraw the image.
+
+        Parameters
+        ----------
+        data : array-like
+            Array with the shape of the renderer.
+
+        Returns
+        -------
+        HeatmapRenderer
+            The renderer itself.
+
+        """
+        data = reduce.load(data)
+        if tuple(data.shape[:2])!=self.shape:
+            raise ValueError('[imagesc] >data should be of shape %s but is %s.' %(str(self.shape), str(data.shape[:2])))
+        source = data
+        data = reduce.downsample(data, self.block, method=self.args_im['reduce'] or 'mean')
+        data = _imagesc._normalize(data, self.args_im, source=source)
+
+        # The colorbar is part of the background, which is drawn again when the color range changes
+        if self._clim is None or self.clim=='frame':
+            clim, fixed = self._range(data)
+            if clim!=self.image.get_clim() or self._background is None:
+                self.image.set_clim(*clim)
+                self._background = None
+            # With clim='first', frames without finite values do not fix the range
+            if fixed: self._clim = clim
+        self.image.set_data(np.flipud(data))
+        self.draw()
+        return self
+
+    def _range(self, data):
+        vmin, vmax = self.args['vmin'], self.args['vmax']
+        finite = data[np.isfinite(data)]
+        if vmin is None and finite.size>0: vmin = finite.min()
+        if vmax is None and finite.size>0: vmax = finite.max()
+        fixed = (vmin is not None) and (vmax is not None)
+        # Fall back to a non-degenerate range
+        if vmin is None: vmin = 0 if vmax is None else vmax - 1
+        if vmax is None: vmax = vmin + 1
+        if vmin==vmax: vmin, vmax = vmin - 0.5, vmax + 0.5
+        return (float(vmin), float(vmax)), fixed
+
+    def draw(self):
+        """Draw the image on the stored background."""
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.ax.bbox)
+        else:
+            canvas.restore_region(self._background)
+        self.ax.draw_artist(self.image)
+        # Grid lines and spines are drawn on top of the image
+        for collection in self.ax.collections:
+            if collection is not self.image:
+                self.ax.draw_artist(collection)
+        for spine in self.ax.spines.values():
+            self.ax.draw_artist(spine)
+        canvas.blit(self.ax.bbox)
+        if self.args_im['show']: canvas.flush_events()
+
+    def buffer(self):
+        """RGBA pixels of the figure.
+
+        Returns
+        -------
+        numpy array
+            uint8 array of shape (height, width, 4). This is a view on the canvas that changes with the next update.
+
+        """
+        return np.asarray(self.fig.canvas.buffer_rgba())
+
+    def close(self):
+        """Close the figure and release the background."""
+        self._background = None
+        if self.args_im['show']:
+            _imagesc.plt.close(self.fig)
+        else:
+            self.fig.clear()
@@ -1,9 +1,9 @@
-""" This function saves figures in PNG format.
+""" This function saves figures to disk.
 
    import imagesc as imagesc
 
  DESCRIPTION
-   This function saves figures in PNG format.
+   This function saves figures to disk. The cells of vector formats (pdf, svg, eps, ps) are rasterized.
 
  EXAMPLE
    import imagesc as imagesc
@@ -23,12 +23,46 @@
 # Date        : Sep. 2017
 #--------------------------------------------------------------------------
 # Libraries
-from os import mkdir
+from os import makedirs
 from os import path
+from matplotlib.collections import Collection, QuadMesh
+from imagesc.utils.profile import profiled
+
+# File formats that are written as vectors. The cell layers are rasterized at the dpi.
+VECTOR_FORMATS = ['pdf', 'svg', 'svgz', 'eps', 'ps']
+# Number of paths of a collection above which it is rasterized in vector formats.
+RASTER_PATHS = 1000
 
 #%%
-def savefig(fig, filepath, dpi=100, transp=False):
-    out=False # Returns True if succesful
+@profiled
+def savefig(fig, filepath, dpi=100, transp=False, rasterize=True, verbose=3):
+    """Save the figure to disk.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to save.
+    filepath : String
+        Path of the file, such as 'c://temp/heatmap.png'. The extension sets the file format.
+    dpi : int, (default: 100)
+        Dots per inch. For vector formats, this is the resolution of the rasterized cells.
+    transp : Bool, (default: False)
+        Transparent background.
+    rasterize : Bool, (default: True)
+        For vector formats (pdf, svg, eps, ps), the cells are rasterized. Collections with more than RASTER_PATHS paths
+        and all quadmeshes, such as the cells of seaborn, are rasterized. Labels, titles and the colorbar remain vectors.
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict or Bool
+        'filepath' : path of the figure.
+        'filesize' : size of the file in bytes.
+        False when no filepath is given.
+
+    """
+    out=False # Returns the path and size if succesful
     Param = {}
     Param['filepath']     = filepath
     Param['dpi']          = dpi
@@ -38,12 +72,44 @@ def savefig(fig, filepath, dpi=100, transp=False):
     if Param['filepath']!="":
         # Check dir
         [getpath, getfilename] = path.split(Param['filepath'])
-        if path.exists(getpath)==False:
-            mkdir(getpath)
-
-        #save file
-        #print(fig.canvas.get_supported_filetypes())
-        fig.savefig(Param['filepath'], dpi=Param['dpi'], transparent=Param['transp'], bbox_inches='tight')
-        out=True
-        
+        if getpath!='' and path.exists(getpath)==False:
+            makedirs(getpath)
+
+        # Rasterize the cell layers of vector formats
+        fmt = path.splitext(getfilename)[1][1:].lower()
+        artists = _heavy_artists(fig) if (rasterize and fmt in VECTOR_FORMATS) else []
+        states = [artist.get_rasterized() for artist in artists]
+        try:
+            for artist in artists:
+                artist.set_rasterized(True)
+            #save file
+            fig.savefig(Param['filepath'], dpi=Param['dpi'], transparent=Param['transp'], bbox_inches='tight')
+        finally:
+            for artist, state in zip(artists, states):
+                artist.set_rasterized(state)
+        out={'filepath': Param['filepath'], 'filesize': path.getsize(Param['filepath'])}
+        if verbose>=3: print('[imagesc] >Figure is written to [%s] (%s).' %(out['filepath'], _filesize(out['filesize'])))
+
     return(out)
+
+
+#%% Artists with many cells
+def _heavy_artists(fig):
+    artists = []
+    for ax in fig.axes:
+        # The colorbar remains a vector
+        if hasattr(ax, '_colorbar'):
+            continue
+        for artist in ax.collections:
+            if isinstance(artist, QuadMesh) or (isinstance(artist, Collection) and len(artist.get_paths())>RASTER_PATHS):
+                artists.append(artist)
+    return artists
+
+
+#%% Readable file size
+def _filesize(size):
+    for unit in ['bytes', 'KB', 'MB']:
+        if size<1024:
+            return '%.0f %s' %(size, unit) if unit=='bytes' else '%.1f %s' %(size, unit)
+        size = size / 1024
+    return '%.1f GB' %(size)
@@ -0,0 +1,121 @@
+""" Thinning of tick labels to the space that is available on the axis."""
+# --------------------------------------------------------------------------
+# Name        : ticks.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from matplotlib.font_manager import FontProperties
+import matplotlib
+import numpy as np
+
+# Approximate width of a character and height of a line, relative to the font size.
+CHAR_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+
+
+# %% Thin
+def thin(labels, length, fontsize=10, rotation=0, axis='x', pinned=None):
+    """Indices of the labels that fit on the axis.
+
+    The size of the labels is estimated from the number of characters and the font size, so no text layout is required.
+    When not all labels fit, every n-th label is kept. Pinned labels are always kept, and the labels that would overlap with them are removed.
+
+    Parameters
+    ----------
+    labels : array-like
+        Labels of the ticks.
+    length : float
+        Length of the axis in points.
+    fontsize : float, (default: 10)
+        Font size of the labels in points.
+    rotation : float, (default: 0)
+        Rotation of the labels in degrees.
+    axis : String, (default: 'x')
+        'x' or 'y'.
+    pinned : list, (default: None)
+        Labels that are always shown. Labels are compared as strings.
+
+    Returns
+    -------
+    numpy array
+        Sorted indices of the labels that are shown.
+
+    """
+    labels = np.asarray(labels).astype(str)
+    n = len(labels)
+    if n==0:
+        return np.arange(0)
+    # Extent of a label along the axis
+    width = CHAR_WIDTH * fontsize * np.char.str_len(labels).max()
+    height = LINE_HEIGHT * fontsize
+    angle = np.deg2rad(rotation)
+    if axis=='x':
+        extent = width * abs(np.cos(angle)) + height * abs(np.sin(angle))
+    else:
+        extent = width * abs(np.sin(angle)) + height * abs(np.cos(angle))
+    capacity = max(1, int(length // max(extent, 1e-9)))
+    if n<=capacity:
+        return np.arange(n)
+
+    step = int(np.ceil(n / capacity))
+    index = np.arange(0, n, step)
+    if pinned is not None and len(pinned)>0:
+        keep = np.flatnonzero(np.isin(labels, np.asarray(pinned).astype(str)))
+        if len(keep)>0:
+            # Remove the labels that are within one step of a pinned label
+            distance = np.abs(index[:, None] - keep[None, :]).min(axis=1)
+            index = np.union1d(index[distance>=step], keep)
+    return index
+
+
+# %% Set ticks
+def set_ticks(ax, axis, labels, args_im, offset=0, step=1, **kwargs):
+    """Set the ticks and labels of an axis after thinning the labels.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes of the heatmap.
+    axis : String
+        'x' or 'y'.
+    labels : array-like
+        Label of each row or column.
+    args_im : dict
+        Settings of imagesc with 'label_thinning', 'pinned_labels', 'xtickRot' and 'ytickRot'.
+    offset : float, (default: 0)
+        Position of the first tick in data coordinates, such as 0.5 for the centers of the cells.
+    step : int, (default: 1)
+        Distance between the ticks in data coordinates, such as the block size of reduced data.
+    **kwargs
+        Arguments for the tick labels, such as ha and rotation_mode.
+
+    Returns
+    -------
+    numpy array
+        Indices of the labels that are shown.
+
+    """
+    rotation = args_im['xtickRot'] if axis=='x' else args_im['ytickRot']
+    labels = np.asarray(labels)
+    if args_im['label_thinning']:
+        fontsize = FontProperties(size=matplotlib.rcParams['%stick.labelsize' %(axis)]).get_size_in_points()
+        # Length of the axis in points
+        position = ax.get_position()
+        if axis=='x':
+            length = position.width * ax.figure.get_figwidth() * 72
+        else:
+            length = position.height * ax.figure.get_figheight() * 72
+        index = thin(labels, length, fontsize=fontsize, rotation=rotation, axis=axis, pinned=args_im['pinned_labels'])
+    else:
+        index = np.arange(len(labels))
+
+    if axis=='x':
+        ax.set_xticks(index * step + offset)
+        ax.set_xticklabels(labels[index], rotation=rotation, **kwargs)
+    else:
+        ax.set_yticks(index * step + offset)
+        ax.set_yticklabels(labels[index], rotation=rotation, **kwargs)
+    return index
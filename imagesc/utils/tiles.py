@@ -0,0 +1,264 @@
+""" Multi-resolution tile pyramid of very large heatmaps."""
+# --------------------------------------------------------------------------
+# Name        : tiles.py
+# Author      : E.Taskesen
+# Mail        : erdogant@gmail.com
+# Licence     : MIT
+# --------------------------------------------------------------------------
+
+# %% Libraries
+from imagesc.utils import reduce, raster
+from imagesc.utils.cache import hash_key
+from imagesc.utils.profile import profiled
+from imagesc.utils.normalize import normalize as _normalize
+import numpy as np
+import json
+import os
+
+MANIFEST = 'tiles.json'
+
+
+# %% Tiles
+@profiled
+def tiles(data, out_dir, tile_size=256, cmap='coolwarm', vmin=None, vmax=None, normalize=False, reduce='mean', verbose=3):
+    """Export the heatmap as a pyramid of PNG tiles that can be used in zoomable viewers.
+
+    Zoom level 0 is a single tile that covers the full data. At every next level the resolution
+    doubles, up to the last level where one pixel is one cell. Every tile is stored as
+    out_dir/z/x/y.png, where x is the column and y the row of the tile, and a manifest with the
+    layout is stored as out_dir/tiles.json. The colors are the same as clean(raster=True),
+    and a single color scale is used for all levels.
+
+    The data is read once in tiles of tile_size x tile_size cells and the coarser levels are
+    aggregated from their four children. The hash of the source region of each tile is stored
+    in the manifest, and tiles of which the source region did not change are not written again.
+    Note that all source regions are still read and hashed on every export; only the coloring and
+    writing of the unchanged PNG files is skipped. Tiles of a previous export that are not part of
+    the new export, such as the zoom levels of larger data, are removed.
+
+    Parameters
+    ----------
+    data : array-like
+        data array. np.memmap, path to a .npy file, chunked arrays (h5py, zarr) and scipy.sparse matrices are read tile by tile.
+    out_dir : String
+        Directory to store the tiles.
+    tile_size : int, (default: 256)
+        Number of pixels in the width and height of a tile.
+    cmap : String or matplotlib Colormap, (default: 'coolwarm')
+        Name of the colormap. Custom colormaps, including their bad, over and under colors, are used as is.
+    vmin : float, (default: None)
+        Minimum of the color range. None uses the minimum value in the data.
+    vmax : float, (default: None)
+        Maximum of the color range. None uses the maximum value in the data.
+    normalize : Bool or String, (default: False)
+        Normalize the data using the 'global' method, see imagesc.normalize().
+    reduce : String, (default: 'mean')
+        Aggregation of the cells in the coarser levels.
+            * 'mean'
+            * 'max'
+            * 'min'
+    verbose : int [0-5], (default: 3)
+        Print to screen. 0: None, 1: Error, 2: Warning, 3: Info, 4: Debug, 5: Trace.
+
+    Returns
+    -------
+    dict
+        The manifest.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import imagesc as imagesc
+    >>> X = np.random.rand(5000, 3000)
+    >>> manifest = imagesc.tiles(X, 'heatmap_tiles', tile_size=256, cmap='viridis')
+
+    """
+    if reduce not in ['mean', 'max', 'min']:
+        raise ValueError('[imagesc] >reduce should be one of %s' %(['mean', 'max', 'min']))
+    if normalize not in [False, True, 'global']:
+        raise ValueError('[imagesc] >normalize should be False or "global" to keep a single color scale for all tiles.')
+
+    # The lookup table identifies the colors of custom colormaps, which can have the name of another colormap.
+    table, cmap = raster.lut(cmap), raster.colormap(cmap)
+    data = _load(data)
+    nrows, ncols = data.shape[0], data.shape[1]
+    zoom = max(int(np.ceil(np.log2(max(nrows, ncols) / tile_size))), 0)
+
+    # A single color scale for all tiles
+    stats = None
+    if normalize or vmin is None or vmax is None:
+        stats = _stats(data)
+    if vmin is None or vmax is None:
+        low, high = stats['min'], stats['max']
+        if normalize:
+            low, high = _normalize(np.array([low, high]), method='global', stats=stats)
+        if vmin is None: vmin = float(low)
+        if vmax is None: vmax = float(high)
+
+    manifest = {'shape': [nrows, ncols],
+                'tile_size': tile_size,
+                'min_zoom': 0,
+                'max_zoom': zoom,
+                'levels': [],
+                'cmap': cmap.name,
+                'cmap_hash': hash_key(table),
+                'vmin': float(vmin),
+                'vmax': float(vmax),
+                'normalize': bool(normalize),
+                'reduce': reduce,
+                'url': '{z}/{x}/{y}.png',
+                'hashes': {},
+                }
+    for z in range(zoom + 1):
+        block = 2**(zoom - z)
+        shape = [int(np.ceil(nrows / block)), int(np.ceil(ncols / block))]
+        manifest['levels'].append({'zoom': z, 'block': block, 'shape': shape, 'tiles': [int(np.ceil(shape[1] / tile_size)), int(np.ceil(shape[0] / tile_size))]})
+
+    # Tiles of a previous export are only reused when the layout and color scale are the same
+    previous = _read_manifest(out_dir)
+    params = ['shape', 'tile_size', 'max_zoom', 'cmap', 'cmap_hash', 'vmin', 'vmax', 'normalize', 'reduce']
+    reuse = {}
+    if previous is not None and all(previous.get(name)==manifest[name] for name in params):
+        reuse = previous.get('hashes', {})
+
+    builder = _Pyramid(data, out_dir, manifest, cmap, stats, reuse)
+    builder.build(0, 0, 0)
+    removed = 0 if previous is None else _remove_stale(out_dir, previous, manifest)
+    _write_manifest(out_dir, manifest)
+    if verbose>=3: print('[imagesc] >%d tiles are written, %d tiles are unchanged and %d tiles are removed in [%s].' %(builder.written, builder.unchanged, removed, out_dir))
+    return manifest
+
+
+def _stats(data):
+    # Statistics of the full data, computed in bands of rows
+    return reduce.stats(data)
+
+
+def _load(data):
+    data = reduce.load(data)
+    # Sparse matrices are sliced by rows and columns
+    if reduce.issparse(data):
+        data = data.tocsr()
+    return data
+
+
+# %% Tile pyramid
+class _Pyramid:
+    """Depth-first construction of the tiles.
+
+    For the 'mean', every tile is kept as the sum and the count of the non-missing cells so that
+    the parent is the exact mean of the cells in its blocks. For 'max' and 'min', the values
+    of the children are aggregated directly.
+
+    """
+
+    def __init__(self, data, out_dir, manifest, cmap, stats, reuse):
+        self.data = data
+        self.out_dir = out_dir
+        self.manifest = manifest
+        self.cmap = cmap
+        self.stats = stats
+        self.reuse = reuse
+        self.size = manifest['tile_size']
+        self.method = manifest['reduce']
+        self.written = 0
+        self.unchanged = 0
+
+    def build(self, z, x, y):
+        size = self.size
+        if z==self.manifest['max_zoom']:
+            region = reduce.todense(self.data[y * size:(y + 1) * size, x * size:(x + 1) * size])
+            key = hash_key(region)
+            region = region.astype(np.float64)
+            tile = np.full((size, size), np.nan)
+            tile[:region.shape[0], :region.shape[1]] = region
+            if self.method=='mean':
+                valid = ~np.isnan(tile)
+                tile = (np.where(valid, tile, 0), valid.astype(np.int64))
+        else:
+            tile, key = self._merge(z, x, y)
+
+        self._write(z, x, y, tile, key)
+        return tile, key
+
+    def _merge(self, z, x, y):
+        size = self.size
+        tiles = self.manifest['levels'][z + 1]['tiles']
+        keys = []
+        if self.method=='mean':
+            total, count = np.zeros((2 * size, 2 * size)), np.zeros((2 * size, 2 * size), dtype=np.int64)
+        else:
+            values = np.full((2 * size, 2 * size), np.nan)
+        for dy in range(2):
+            for dx in range(2):
+                cx, cy = 2 * x + dx, 2 * y + dy
+                if cx>=tiles[0] or cy>=tiles[1]:
+                    keys.append(None)
+                    continue
+                child, key = self.build(z + 1, cx, cy)
+                keys.append(key)
+                part = (slice(dy * size, (dy + 1) * size), slice(dx * size, (dx + 1) * size))
+                if self.method=='mean':
+                    total[part], count[part] = child
+                else:
+                    values[part] = child
+
+        # Aggregate blocks of 2x2 cells
+        if self.method=='mean':
+            tile = (total.reshape(size, 2, size, 2).sum(axis=(1, 3)), count.reshape(size, 2, size, 2).sum(axis=(1, 3)))
+        else:
+            tile = reduce.downsample(values, (2, 2), method=self.method)
+        return tile, hash_key(tuple(keys))
+
+    def _write(self, z, x, y, tile, key):
+        name = '%d/%d/%d' %(z, x, y)
+        self.manifest['hashes'][name] = key
+        filepath = os.path.join(self.out_dir, str(z), str(x), '%d.png' %(y))
+        if self.reuse.get(name)==key and os.path.isfile(filepath):
+            self.unchanged += 1
+            return
+
+        if self.method=='mean':
+            total, count = tile
+            with np.errstate(invalid='ignore', divide='ignore'):
+                tile = total / count
+        # Remove the cells outside the data
+        shape = self.manifest['levels'][z]['shape']
+        tile = tile[:min(self.size, shape[0] - y * self.size), :min(self.size, shape[1] - x * self.size)]
+        if self.manifest['normalize']:
+            tile = _normalize(tile, method='global', stats=self.stats)
+        rgba = raster.to_rgba(tile, cmap=self.cmap, vmin=self.manifest['vmin'], vmax=self.manifest['vmax'])
+        raster.to_png(rgba, filepath=filepath)
+        self.written += 1
+
+
+# %% Remove the tiles of a previous export
+def _remove_stale(out_dir, previous, manifest):
+    removed = 0
+    for name in previous.get('hashes', {}):
+        if name in manifest['hashes']: continue
+        z, x, y = name.split('/')
+        filepath = os.path.join(out_dir, z, x, '%s.png' %(y))
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+            removed += 1
+        # Remove the directories that became empty
+        for dirpath in [os.path.join(out_dir, z, x), os.path.join(out_dir, z)]:
+            if os.path.isdir(dirpath) and len(os.listdir(dirpath))==0:
+                os.rmdir(dirpath)
+    return removed
+
+
+# %% Manifest
+def _read_manifest(out_dir):
+    filepath = os.path.join(out_dir, MANIFEST)
+    if not os.path.isfile(filepath):
+        return None
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir, manifest):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
@@ -14,7 +14,8 @@ with open("README.md", "r") as fh:
     long_description = fh.read()
 
 setuptools.setup(
-     install_requires=['matplotlib','numpy','pandas','ismember', 'packaging','ismember','d3heatmap'],
+     install_requires=['matplotlib','numpy','pandas', 'packaging','d3heatmap','scipy'],
+     extras_require={'fast': ['fastcluster']},
      python_requires='>=3',
      name='imagesc',
      version=new_version,
@@ -0,0 +1,18 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption('--runslow', action='store_true', default=False, help='Run the tests that are marked as slow.')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: test takes minutes, only runs with --runslow.')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--runslow'):
+        return
+    skip = pytest.mark.skip(reason='Use --runslow to run.')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
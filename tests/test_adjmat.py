@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+import imagesc
+
+
+# Reference implementations of vec2adjmat and adjmat2vec before they were rewritten
+def _vec2adjmat_crosstab(source, target, weight=None, symmetric=True):
+    if weight is None: weight = [1] * len(source)
+    df = pd.DataFrame(np.c_[source, target], columns=['source', 'target'])
+    adjmat = pd.crosstab(df['source'], df['target'], values=weight, aggfunc='sum').fillna(0)
+    nodes = np.unique(list(adjmat.columns.values) + list(adjmat.index.values))
+    if symmetric:
+        for node in np.setdiff1d(nodes, adjmat.columns.values):
+            adjmat[node] = 0
+        adjmat = adjmat.T
+        for node in np.setdiff1d(nodes, adjmat.columns.values):
+            adjmat[node] = 0
+        adjmat = adjmat.T
+        adjmat = adjmat.loc[adjmat.columns.values, :]
+    return adjmat
+
+
+def _adjmat2vec_stack(adjmat, min_weight=0):
+    adjmat = adjmat.stack().reset_index()
+    adjmat.columns = ['source', 'target', 'weight']
+    adjmat = adjmat.loc[adjmat['weight']>=min_weight, :]
+    return adjmat.reset_index(drop=True)
+
+
+def _edges(n=300, nodes=40, seed=0):
+    rng = np.random.RandomState(seed)
+    source = np.array(['node%d' %(i) for i in rng.randint(0, nodes, n)])
+    target = np.array(['node%d' %(i) for i in rng.randint(0, nodes // 2, n)])
+    weight = rng.randint(1, 5, n).astype(float)
+    return source, target, weight
+
+
+def _assert_frame(adjmat, expected):
+    np.testing.assert_array_equal(adjmat.index.values.astype(str), expected.index.values.astype(str))
+    np.testing.assert_array_equal(adjmat.columns.values.astype(str), expected.columns.values.astype(str))
+    np.testing.assert_allclose(np.asarray(adjmat, dtype=float), np.asarray(expected, dtype=float))
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_vec2adjmat_equals_crosstab(symmetric):
+    source, target, weight = _edges()
+    expected = _vec2adjmat_crosstab(source, target, weight=weight, symmetric=symmetric)
+    _assert_frame(imagesc.vec2adjmat(source, target, weight=weight, symmetric=symmetric), expected)
+
+
+def test_vec2adjmat_example():
+    source = ['Cloudy', 'Cloudy', 'Sprinkler', 'Rain']
+    target = ['Sprinkler', 'Rain', 'Wet_Grass', 'Wet_Grass']
+    _assert_frame(imagesc.vec2adjmat(source, target), _vec2adjmat_crosstab(source, target))
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_vec2adjmat_sparse_equals_dense(symmetric):
+    source, target, weight = _edges()
+    dense = imagesc.vec2adjmat(source, target, weight=weight, symmetric=symmetric)
+    sparse = imagesc.vec2adjmat(source, target, weight=weight, symmetric=symmetric, return_type='sparse')
+    assert all(isinstance(dtype, pd.SparseDtype) and dtype.fill_value==0 for dtype in sparse.dtypes)
+    _assert_frame(sparse.sparse.to_dense(), dense)
+    matrix, rows, cols = imagesc.vec2adjmat(source, target, weight=weight, symmetric=symmetric, return_type='scipy')
+    _assert_frame(pd.DataFrame(matrix.toarray(), index=rows, columns=cols), dense)
+
+
+@pytest.mark.parametrize('min_weight', [0, 1, 3])
+def test_adjmat2vec_equals_stack(min_weight):
+    source, target, weight = _edges()
+    adjmat = imagesc.vec2adjmat(source, target, weight=weight)
+    expected = _adjmat2vec_stack(adjmat, min_weight=min_weight)
+    vector = imagesc.adjmat2vec(adjmat, min_weight=min_weight, verbose=0)
+    np.testing.assert_array_equal(vector['source'].values.astype(str), expected['source'].values.astype(str))
+    np.testing.assert_array_equal(vector['target'].values.astype(str), expected['target'].values.astype(str))
+    np.testing.assert_allclose(vector['weight'].values.astype(float), expected['weight'].values.astype(float))
+
+
+def test_adjmat2vec_chunks():
+    source, target, weight = _edges()
+    adjmat = imagesc.vec2adjmat(source, target, weight=weight)
+    vector = imagesc.adjmat2vec(adjmat, min_weight=1, verbose=0)
+    chunks = pd.concat(list(imagesc.adjmat2vec(adjmat, min_weight=1, chunksize=7, verbose=0)), ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, vector, check_dtype=False)
+
+
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_accumulator_equals_vec2adjmat(symmetric):
+    source, target, weight = _edges(n=1000)
+    acc = imagesc.AdjacencyAccumulator(symmetric=symmetric)
+    for i in range(0, len(source), 150):
+        acc.add(source[i:i + 150], target[i:i + 150], weight=weight[i:i + 150])
+        # Intermediate results are equal to vec2adjmat on the edges that are added so far
+        _assert_frame(acc.adjmat(), imagesc.vec2adjmat(source[:i + 150], target[:i + 150], weight=weight[:i + 150], symmetric=symmetric))
+    assert acc.n_edges==len(source)
+    _assert_frame(acc.adjmat(return_type='sparse').sparse.to_dense(), imagesc.vec2adjmat(source, target, weight=weight, symmetric=symmetric))
+
+
+def test_accumulator_heatmap_is_sparse(monkeypatch):
+    from imagesc import imagesc as module
+    source, target, weight = _edges()
+    acc = imagesc.AdjacencyAccumulator()
+    acc.add(source, target, weight=weight)
+    received = {}
+    monkeypatch.setattr(module, 'fast', lambda data, row_labels, col_labels, **args: received.update(data=data, rows=row_labels))
+    acc.heatmap(kind='fast')
+    assert hasattr(received['data'], 'tocoo')
+    np.testing.assert_array_equal(received['rows'], acc.adjmat().index.values)
+
+
+@pytest.mark.slow
+def test_vec2adjmat_sparse_scale():
+    # 50k nodes would need 20GB as dense frame. The sparse frame is created in a few seconds.
+    import time
+    rng = np.random.RandomState(0)
+    source, target = rng.randint(0, 50000, 200000), rng.randint(0, 50000, 200000)
+    source[:50000] = target[:50000] = np.arange(50000)
+    start = time.perf_counter()
+    adjmat = imagesc.vec2adjmat(source, target, return_type='sparse')
+    assert time.perf_counter() - start < 10
+    assert adjmat.shape==(50000, 50000)
+    assert all(dtype.fill_value==0 for dtype in adjmat.dtypes)
+    assert adjmat.sparse.to_coo().sum()==len(source)
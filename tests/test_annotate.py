@@ -0,0 +1,74 @@
+import io
+import re
+import numpy as np
+import pytest
+import matplotlib
+import matplotlib.pyplot as plt
+from imagesc.utils import annotate
+
+
+def _image(data):
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    im = ax.imshow(data, cmap='Greys')
+    return fig, ax, im
+
+
+def _pixels(fig):
+    fig.canvas.draw()
+    return np.array(fig.canvas.buffer_rgba())
+
+
+@pytest.mark.parametrize('valfmt', ['{x:.2f}', '$ {x:.1f}', '%.3f', '%d', matplotlib.ticker.FuncFormatter(lambda x, pos: '%d%%' %(x * 100))])
+def test_format_values(valfmt):
+    data = np.round(np.random.RandomState(0).rand(6, 5), 1)
+    if isinstance(valfmt, str) and '{' in valfmt:
+        expected = [valfmt.format(x=x) for x in data.ravel()]
+    elif isinstance(valfmt, str):
+        expected = [valfmt %(x) for x in data.ravel()]
+    else:
+        expected = [valfmt(x, None) for x in data.ravel()]
+    labels = annotate.format_values(data, valfmt)
+    assert labels.shape==data.shape
+    assert list(labels.ravel())==expected
+
+
+def test_colors_by_threshold():
+    data = np.array([[0.0, 0.2], [0.8, 1.0]])
+    fig, ax, im = _image(data)
+    artist = annotate.annotate(im, valfmt='{x:.1f}', textcolors=('black', 'white'), threshold=0.5)
+    assert list(artist._colors)==['black', 'black', 'white', 'white']
+    assert list(artist._labels)==['0.0', '0.2', '0.8', '1.0']
+    plt.close(fig)
+
+
+def test_agg_draws_labels():
+    data = np.arange(12.).reshape(3, 4)
+    fig, ax, im = _image(data)
+    empty = _pixels(fig)
+    artist = annotate.annotate(im, valfmt='{x:.0f}', textcolors=('red', 'red'))
+    pixels = _pixels(fig)
+    # Red label pixels are drawn in every cell
+    changed = np.argwhere((pixels!=empty).any(axis=2))
+    assert len(changed)>0
+    for x, y in im.axes.transData.transform(np.c_[artist._x, artist._y]):
+        row, col = int(round(fig.bbox.height - y)), int(round(x))
+        cell = pixels[row - 5:row + 6, col - 5:col + 6].reshape(-1, 4)
+        assert ((cell[:, 0]>150) & (cell[:, 1]<100)).any()
+    # Cells that are smaller than min_pixels are not annotated
+    artist.min_pixels = 1000
+    np.testing.assert_array_equal(_pixels(fig), empty)
+    plt.close(fig)
+
+
+def test_vector_keeps_text():
+    data = np.arange(20.).reshape(4, 5)
+    fig, ax, im = _image(data)
+    annotate.annotate(im, valfmt='v{x:.0f}')
+    ax.set_xlim(-0.5, 1.5)
+    buffer = io.StringIO()
+    with matplotlib.rc_context({'svg.fonttype': 'none'}):
+        fig.savefig(buffer, format='svg')
+    labels = re.findall(r'>(v\d+)</text>', buffer.getvalue())
+    # Only the cells of the first two columns are in view
+    assert sorted(labels)==sorted('v%d' %(x) for x in data[:, :2].ravel())
+    plt.close(fig)
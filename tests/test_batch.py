@@ -0,0 +1,31 @@
+import os
+import numpy as np
+import imagesc
+from imagesc.imagesc import render
+
+
+def _read(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read()
+
+
+def test_render_many_order_and_errors(tmp_path):
+    arrays = [np.random.RandomState(i).rand(10, 12) for i in range(4)]
+    # Fails in the parent process, and in the worker process
+    arrays.insert(1, np.array([[None]], dtype=object))
+    arrays.insert(3, np.random.rand(2, 2, 2, 2))
+    names = ['heatmap_%s.png' %(i) for i in 'abcdef']
+    out_dir = str(tmp_path / 'batch')
+    results = imagesc.render_many((data for data in arrays), out_dir=out_dir, workers=2, names=names, verbose=0)
+
+    assert [r['index'] for r in results]==list(range(len(arrays)))
+    assert [os.path.basename(r['filepath']) for r in results]==names
+    assert [r['error'] is not None for r in results]==[False, True, False, True, False, False]
+    assert 'dtype object' in results[1]['error']
+    assert not os.path.isfile(results[3]['filepath'])
+    # Every heatmap equals the heatmap of the single-call function
+    for r in results:
+        if r['error'] is not None: continue
+        filepath = str(tmp_path / 'single.png')
+        render(arrays[r['index']], kind='fast', filepath=filepath, verbose=0)
+        assert _read(r['filepath'])==_read(filepath)
@@ -0,0 +1,43 @@
+import pytest
+from imagesc import benchmark
+
+
+@pytest.mark.slow
+def test_memory_leak():
+    # Renders 10k figures headless. Raises when figures remain open or the memory keeps growing.
+    results = benchmark.memory_leak(n=10000, kind='fast', max_growth=50, verbose=0)
+    assert results['open_figures']==0
+
+
+def test_memory_leak_short():
+    results = benchmark.memory_leak(n=50, kind='fast', max_growth=50, verbose=0)
+    assert results['open_figures']==0
+
+
+
+def _results(time=1.0, peak_rss=100.0, error=None):
+    return {'results': [{'function': 'fast', 'shape': [10, 10], 'labels': False, 'time': time, 'peak_rss': peak_rss, 'size': 1000, 'error': error}]}
+
+
+def test_compare():
+    assert benchmark.compare(_results(), _results(), verbose=0)==[]
+    assert benchmark.compare(_results(time=1.1), _results(), tolerance=0.2, verbose=0)==[]
+    regressions = benchmark.compare(_results(time=2.0, peak_rss=200), _results(), tolerance=0.2, verbose=0)
+    assert [(r['reason'], r['ratio']) for r in regressions]==[('time', 2.0), ('peak_rss', 2.0)]
+    assert [r['reason'] for r in benchmark.compare(_results(error='timeout'), _results(), verbose=0)]==['error']
+    # Cases that failed in the baseline are not compared
+    assert benchmark.compare(_results(time=2.0), _results(error='timeout'), verbose=0)==[]
+
+
+@pytest.mark.slow
+def test_run_and_compare(tmp_path):
+    filepath = str(tmp_path / 'benchmark.json')
+    baseline = benchmark.run(functions=['fast', 'clean', 'vec2adjmat'], sizes=[(10, 10), (100, 100)], filepath=filepath, verbose=0)
+    assert len(baseline['results'])==3 * 2 * 2
+    assert all(result['error'] is None and result['time']>0 and result['size']>0 for result in baseline['results'])
+    # A baseline that was ten times faster is reported
+    faster = {**baseline, 'results': [{**result, 'time': result['time'] / 10} for result in baseline['results']]}
+    results = benchmark.run(functions=['fast'], sizes=[(10, 10)], labels=(False,), baseline=faster, tolerance=0.5, verbose=0)
+    assert [r['reason'] for r in results['regressions']]==['time']
+    # The file of the baseline is read
+    assert benchmark.compare(filepath, filepath, verbose=0)==[]
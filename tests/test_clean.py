@@ -0,0 +1,20 @@
+import io
+import numpy as np
+from PIL import Image
+import imagesc
+
+
+def _size(png):
+    return Image.open(io.BytesIO(png)).size
+
+
+def test_raster_one_pixel_per_cell():
+    X = np.random.rand(3000, 2000)
+    assert _size(imagesc.clean(X, raster=True, verbose=0))==(2000, 3000)
+
+
+def test_raster_reduce_keeps_aspect_ratio():
+    X = np.random.rand(3000, 2000)
+    width, height = _size(imagesc.clean(X, raster=True, reduce='mean', verbose=0))
+    assert width<2000
+    assert np.isclose(height / width, 1.5)
@@ -0,0 +1,61 @@
+import os
+import numpy as np
+import pandas as pd
+import imagesc
+
+
+def _df(seed=0, n=20):
+    return pd.DataFrame(np.random.RandomState(seed).rand(n, n))
+
+
+def test_cache_hit(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = str(tmp_path / 'out' / 'heatmap.html')
+    first = imagesc.d3(_df(), path=path, compact=True, showfig=False, cache=True, cache_dir=cache_dir, verbose=0)
+    os.remove(path)
+    second = imagesc.d3(_df(), path=path, compact=True, showfig=False, cache=True, cache_dir=cache_dir, verbose=0)
+    assert second['path']==first['path']==path
+    assert os.path.isfile(path)
+    assert second['filesize']==first['filesize']
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.html')])==1
+
+
+def test_cache_eviction(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    imagesc.d3(_df(0), compact=True, showfig=False, cache=True, cache_dir=cache_dir, cache_size=1000, verbose=0)
+    out = imagesc.d3(_df(1), compact=True, showfig=False, cache=True, cache_dir=cache_dir, cache_size=1000, verbose=0)
+    # The older heatmap is removed, the heatmap that is just created is kept although it exceeds cache_size
+    assert os.path.isfile(out['path'])
+    assert [name for name in os.listdir(cache_dir) if name.endswith('.html')]==[os.path.basename(out['path'])]
+
+
+def test_cache_is_opt_in(tmp_path):
+    path = str(tmp_path / 'heatmap.html')
+    out = imagesc.d3(_df(), path=path, compact=True, showfig=False, verbose=0)
+    assert out['path']==path
+    assert os.path.isfile(path)
+
+
+def test_title_is_escaped(tmp_path):
+    path = str(tmp_path / 'heatmap.html')
+    imagesc.d3(_df(), path=path, compact=True, showfig=False, title='</title><script>alert(1)</script>', description='<b>x</b>', verbose=0)
+    with open(path, encoding='utf8') as f:
+        html = f.read()
+    assert '<script>alert(1)</script>' not in html
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in html
+    assert '<b>x</b>' not in html
+
+
+def test_unsupported_arguments_warn(tmp_path, capsys):
+    imagesc.d3(_df(), path=str(tmp_path / 'heatmap.html'), compact=True, showfig=False, clust=np.zeros(20), verbose=2)
+    assert 'clust is not supported' in capsys.readouterr().out
+
+
+def test_quantize_infinite():
+    from imagesc.utils.d3export import quantize
+    data = np.array([[np.nan, -np.inf, 1.0], [2.0, 3.0, np.inf]])
+    values, vmin, vmax = quantize(data)
+    assert (vmin, vmax)==(1.0, 3.0)
+    np.testing.assert_array_equal(values, [[255, 0, 0], [127, 254, 254]])
+    values, vmin, vmax = quantize(np.array([np.inf, -np.inf, np.nan]))
+    np.testing.assert_array_equal(values, [0, 0, 255])
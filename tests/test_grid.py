@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import imagesc
+from imagesc.utils import grid
+
+
+def _axes(shape):
+    fig, ax = plt.subplots()
+    ax.set_xlim(-0.5, shape[1] - 0.5)
+    ax.set_ylim(shape[0] - 0.5, -0.5)
+    return fig, ax
+
+
+def test_gridlines_single_collection():
+    fig, ax = _axes((3, 4))
+    lines = grid.gridlines(ax, (3, 4), color='#ff0000', linewidth=0.5)
+    assert isinstance(lines, LineCollection)
+    assert list(ax.collections)==[lines]
+    segments = lines.get_segments()
+    # Borders of 4 columns and 3 rows
+    assert len(segments)==5 + 4
+    np.testing.assert_allclose([segment[0, 0] for segment in segments[:5]], np.arange(5) - 0.5)
+    np.testing.assert_allclose([segment[0, 1] for segment in segments[5:]], np.arange(4) - 0.5)
+    # The lines span the limits of the axes
+    np.testing.assert_allclose(segments[0][:, 1], [-0.5, 2.5])
+    np.testing.assert_allclose(segments[5][:, 0], [-0.5, 3.5])
+    assert not lines.get_rasterized()
+    plt.close(fig)
+
+
+def test_gridlines_block_and_raster():
+    fig, ax = _axes((12000, 10))
+    lines = grid.gridlines(ax, (1200, 5), offset=0, block=(10, 2))
+    segments = lines.get_segments()
+    np.testing.assert_allclose([segment[0, 0] for segment in segments[:6]], np.arange(6) * 2)
+    np.testing.assert_allclose(segments[6 + 1200][0, 1], 12000)
+    # More than RASTER_LINES lines are rasterized in vector formats
+    assert lines.get_rasterized()
+    assert not grid.gridlines(ax, (1200, 5), rasterized=False).get_rasterized()
+    plt.close(fig)
+
+
+@pytest.mark.parametrize('shape, linewidth, expected', [((10, 10), 0.5, True), ((2000, 10), 0.5, False), ((10, 10), 50, False)])
+def test_visible(shape, linewidth, expected):
+    assert grid.visible(shape, linewidth, figsize=(5, 5), dpi=100)==expected
+
+
+def test_fast_draws_one_collection():
+    fig, ax = imagesc.fast(np.random.rand(40, 30), linewidth=0.5, show=False, verbose=0)
+    assert len([c for c in ax.collections if isinstance(c, LineCollection)])==1
@@ -0,0 +1,16 @@
+import subprocess
+import sys
+from imagesc import benchmark
+
+
+def test_import_is_lazy():
+    # import imagesc must not load the heavy dependencies
+    code = 'import sys, imagesc; print(",".join(m for m in ["matplotlib", "pandas", "seaborn", "d3heatmap"] if m in sys.modules))'
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    assert out.stdout.strip()==''
+
+
+def test_import_time():
+    results = benchmark.import_time(repeats=3, verbose=0)
+    assert results['loaded']==[]
+    assert results['time']<0.5
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import imagesc
+from imagesc.utils.normalize import METHODS
+
+
+def _data(dtype=np.float64, seed=0):
+    X = np.random.RandomState(seed).rand(30, 20).astype(dtype) * 10
+    X[3, 4] = np.nan
+    return X
+
+
+def _expected(X, method):
+    X = X.astype(np.float64)
+    if method=='global':
+        return (X - np.nanmean(X)) / (np.nanmax(X) - np.nanmin(X))
+    elif method=='row':
+        low = np.nanmin(X, axis=1, keepdims=True)
+        return (X - low) / (np.nanmax(X, axis=1, keepdims=True) - low)
+    elif method=='column':
+        low = np.nanmin(X, axis=0, keepdims=True)
+        return (X - low) / (np.nanmax(X, axis=0, keepdims=True) - low)
+    elif method=='zscore':
+        return (X - np.nanmean(X)) / np.nanstd(X)
+    elif method=='robust':
+        low, median, high = np.nanpercentile(X, [1, 50, 99])
+        return (X - median) / (high - low)
+    elif method=='log':
+        return np.log1p(X - np.nanmin(X))
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_methods(method):
+    X = _data()
+    np.testing.assert_allclose(imagesc.normalize(X, method=method), _expected(X, method), equal_nan=True)
+
+
+@pytest.mark.parametrize('method', ['global', 'row', 'zscore'])
+def test_out_and_inplace(method):
+    X = _data(np.float32)
+    expected = _expected(X, method)
+    out = np.empty_like(X)
+    assert imagesc.normalize(X, method=method, out=out) is out
+    np.testing.assert_allclose(out, expected, rtol=1e-5, equal_nan=True)
+    result = imagesc.normalize(X, method=method, inplace=True)
+    assert result is X and result.dtype==np.float32
+    np.testing.assert_allclose(X, expected, rtol=1e-5, equal_nan=True)
+
+
+def test_inplace_memmap(tmp_path):
+    filepath = str(tmp_path / 'data.dat')
+    X = _data()
+    memmap = np.memmap(filepath, dtype=np.float64, mode='w+', shape=X.shape)
+    memmap[:] = X
+    imagesc.normalize(memmap, method='column', inplace=True)
+    memmap.flush()
+    del memmap
+    stored = np.memmap(filepath, dtype=np.float64, mode='r', shape=X.shape)
+    np.testing.assert_allclose(stored, _expected(X, 'column'), equal_nan=True)
+
+
+def test_dtypes_and_errors():
+    X = np.arange(12).reshape(3, 4)
+    assert imagesc.normalize(X).dtype==np.float64
+    assert imagesc.normalize(X.astype(np.float32)).dtype==np.float32
+    # Constant data is not divided by zero
+    np.testing.assert_array_equal(imagesc.normalize(np.ones((2, 2)), method='row'), np.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        imagesc.normalize(X, inplace=True)
+    with pytest.raises(ValueError):
+        imagesc.normalize(X, method='unknown')
+
+
+def test_global_stats():
+    X = _data()
+    stats = {'min': 0.0, 'max': 20.0, 'mean': 5.0}
+    np.testing.assert_allclose(imagesc.normalize(X, stats=stats), (X - 5) / 20, equal_nan=True)
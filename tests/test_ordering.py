@@ -0,0 +1,134 @@
+import os
+import numpy as np
+import pytest
+import imagesc
+from imagesc.utils import ordering
+
+
+def _data(n=60, m=8, seed=0):
+    return np.random.RandomState(seed).rand(n, m)
+
+
+@pytest.mark.parametrize('cache_dir', [False, True])
+def test_cache_is_read_only(tmp_path, cache_dir):
+    cache_dir = str(tmp_path) if cache_dir else None
+    ordering.clear_cache()
+    first = imagesc.cluster_order(_data(), cache_dir=cache_dir, verbose=0)
+    if cache_dir is not None: ordering.clear_cache()
+    second = imagesc.cluster_order(_data(), cache_dir=cache_dir, verbose=0)
+    np.testing.assert_array_equal(first['row'], second['row'])
+    with pytest.raises(ValueError):
+        second['row'][0] = -1
+    # The dict is a copy, so changing it does not change the cache
+    second['row'] = None
+    assert imagesc.cluster_order(_data(), cache_dir=cache_dir, verbose=0)['row'] is not None
+
+
+def _blobs(n=300, m=6, k=3, seed=0):
+    # Rows of k well separated groups in a random order
+    rng = np.random.RandomState(seed)
+    labels = rng.randint(0, k, n)
+    return rng.randn(n, m) * 0.1 + labels[:, None] * 10, labels
+
+
+def _contiguous(labels):
+    # Number of groups equals the number of changes of the label in the ordering, plus one
+    return np.count_nonzero(np.diff(labels)!=0) + 1
+
+
+def test_exact_equals_scipy():
+    from scipy.cluster import hierarchy
+    X = _data()
+    order = imagesc.cluster_order(X, method='exact', cache=False, verbose=0)
+    np.testing.assert_array_equal(order['row'], hierarchy.leaves_list(hierarchy.linkage(X, method='ward')))
+    np.testing.assert_array_equal(order['col'], hierarchy.leaves_list(hierarchy.linkage(X.T, method='ward')))
+    assert order['row_linkage'].shape==(X.shape[0] - 1, 4)
+
+
+def test_vector_equals_exact():
+    pytest.importorskip('fastcluster')
+    X = _data()
+    exact = imagesc.cluster_order(X, method='exact', cache=False, verbose=0)
+    vector = imagesc.cluster_order(X, method='vector', cache=False, verbose=0)
+    np.testing.assert_array_equal(vector['row'], exact['row'])
+    np.testing.assert_allclose(vector['row_linkage'][:, 2], exact['row_linkage'][:, 2])
+
+
+def test_vector_without_fastcluster(monkeypatch, capsys):
+    monkeypatch.setattr(ordering, '_has_fastcluster', lambda: False)
+    X, labels = _blobs()
+    order = imagesc.cluster_order(X, method='vector', max_samples=50, random_state=0, cache=False, verbose=2)
+    assert 'sample' in capsys.readouterr().out
+    assert order['row_linkage'] is None
+    assert _contiguous(labels[order['row']])==3
+
+
+def test_sample():
+    X, labels = _blobs()
+    order = imagesc.cluster_order(X, method='sample', max_samples=50, random_state=0, cache=False, verbose=0)
+    np.testing.assert_array_equal(np.sort(order['row']), np.arange(X.shape[0]))
+    assert order['row_linkage'] is None
+    # The rows of a group are next to each other
+    assert _contiguous(labels[order['row']])==3
+    # The sample is the full data when there are fewer rows than max_samples
+    exact = imagesc.cluster_order(X, method='exact', cache=False, verbose=0)
+    np.testing.assert_array_equal(imagesc.cluster_order(X, method='sample', cache=False, verbose=0)['row'], exact['row'])
+
+
+@pytest.mark.parametrize('fastcluster', [False, True])
+def test_auto(monkeypatch, fastcluster):
+    if fastcluster: pytest.importorskip('fastcluster')
+    X, labels = _blobs()
+    exact = imagesc.cluster_order(X, method='exact', cache=False, verbose=0)
+    np.testing.assert_array_equal(imagesc.cluster_order(X, method='auto', cache=False, verbose=0)['row'], exact['row'])
+    # Above EXACT_MAX rows, the vector method is used when fastcluster is installed and the sample method otherwise
+    monkeypatch.setattr(ordering, 'EXACT_MAX', 100)
+    monkeypatch.setattr(ordering, '_has_fastcluster', lambda: fastcluster)
+    order = imagesc.cluster_order(X, method='auto', max_samples=50, cache=False, verbose=0)
+    assert (order['row_linkage'] is not None)==fastcluster
+    assert _contiguous(labels[order['row']])==3
+    # The columns are below EXACT_MAX
+    np.testing.assert_array_equal(order['col'], exact['col'])
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        imagesc.cluster_order(_data(), method='unknown', cache=False, verbose=0)
+
+
+def test_cache_hits(monkeypatch):
+    calls = []
+    order_axis = ordering._order
+    monkeypatch.setattr(ordering, '_order', lambda X, *args: calls.append(X.shape) or order_axis(X, *args))
+    ordering.clear_cache()
+    X = _data()
+    first = imagesc.cluster_order(X, verbose=0)
+    assert len(calls)==2
+    # Same data and parameters
+    second = imagesc.cluster_order(X.copy(), verbose=0)
+    assert len(calls)==2
+    np.testing.assert_array_equal(first['row'], second['row'])
+    # Other parameters or other data
+    imagesc.cluster_order(X, linkage='average', verbose=0)
+    assert len(calls)==4
+    Y = X.copy()
+    Y[0, 0] += 1
+    imagesc.cluster_order(Y, verbose=0)
+    assert len(calls)==6
+    imagesc.cluster_order(X, cache=False, verbose=0)
+    assert len(calls)==8
+
+
+def test_cache_on_disk(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path)
+    ordering.clear_cache()
+    first = imagesc.cluster_order(_data(), method='sample', cache_dir=cache_dir, verbose=0)
+    assert len([name for name in os.listdir(cache_dir) if name.startswith('order_')])==1
+    # A new process only has the orderings on disk
+    ordering.clear_cache()
+    monkeypatch.setattr(ordering, '_order', None)
+    second = imagesc.cluster_order(_data(), method='sample', cache_dir=cache_dir, verbose=0)
+    np.testing.assert_array_equal(first['row'], second['row'])
+    assert second['row_linkage'] is None
+    ordering.clear_cache(cache_dir=cache_dir)
+    assert os.listdir(cache_dir)==[]
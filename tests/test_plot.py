@@ -0,0 +1,31 @@
+import numpy as np
+import imagesc
+
+
+def _image(X, **args):
+    fig, ax = imagesc.plot(X, show=False, cbar=False, verbose=0, **args)
+    return ax, ax.images[0]
+
+
+def test_reduce_keeps_extent_and_aspect():
+    X = np.random.rand(1200, 1800, 3)
+    ax, im = _image(X)
+    ax_full, im_full = _image(X, reduce=None)
+    assert im.get_array().shape[0]<1200
+    # Square blocks keep the aspect ratio of the data
+    assert np.isclose(im.get_array().shape[1] / im.get_array().shape[0], 1.5)
+    assert list(im.get_extent())==list(im_full.get_extent())==[-0.5, 1799.5, 1199.5, -0.5]
+    assert ax.get_xlim()==ax_full.get_xlim()
+    assert ax.get_ylim()==ax_full.get_ylim()
+
+
+def test_reduce_ticks_in_original_coordinates():
+    X = np.random.rand(5000, 5000)
+    labels = np.array(['c%d' %(i) for i in range(5000)])
+    ax, im = _image(X, col_labels=labels, label_thinning=False)
+    block = 5000 // im.get_array().shape[1]
+    assert block>1
+    positions = ax.get_xticks()
+    texts = [text.get_text() for text in ax.get_xticklabels()]
+    # The label of the first cell in each block is at the position of that cell
+    assert all(int(text[1:])==int(position) for text, position in zip(texts, positions))
@@ -0,0 +1,49 @@
+import json
+import os
+import numpy as np
+import imagesc
+from imagesc.utils import profile
+
+
+def test_stages_are_not_recorded_without_profiler():
+    assert profile.stage('load') is profile._NULL
+
+
+def test_chrome_trace_schema(tmp_path):
+    filepath = str(tmp_path / 'trace.json')
+    with imagesc.Profiler(memory=True) as profiler:
+        imagesc.render(np.random.rand(30, 40), kind='clean', raster=True, filepath=str(tmp_path / 'heatmap.png'), verbose=0)
+    trace = profiler.to_chrome_trace(filepath)
+    with open(filepath) as f:
+        assert json.load(f)==trace
+
+    assert trace['displayTimeUnit']=='ms'
+    events = trace['traceEvents']
+    names = [event['name'] for event in events]
+    assert 'clean' in names and 'to_png' in names
+    for event in events:
+        assert set(event)=={'name', 'cat', 'ph', 'pid', 'tid', 'ts', 'dur', 'args'}
+        assert event['ph']=='X' and event['pid']==os.getpid()
+        assert event['ts']>=0 and event['dur']>=0
+        assert set(event['args'])=={'allocated', 'peak'}
+    # Complete events are sorted by start time, and nested stages lie within their parent
+    assert [event['ts'] for event in events]==sorted(event['ts'] for event in events)
+    parent = events[names.index('clean')]
+    child = events[names.index('to_png')]
+    assert parent['ts']<=child['ts'] and child['ts'] + child['dur']<=parent['ts'] + parent['dur'] + 1
+
+
+def test_nested_stages():
+    received = []
+    with imagesc.Profiler(callback=received.append) as profiler:
+        with profile.stage('outer'):
+            with profile.stage('inner'):
+                pass
+            with profile.stage('inner'):
+                pass
+    out = profiler.to_dict()
+    assert [event['name'] for event in received]==['inner', 'inner', 'outer']
+    assert [(event['name'], event['depth']) for event in out['events']]==[('outer', 0), ('inner', 1), ('inner', 1)]
+    assert out['stages']['inner']['count']==2
+    assert 'peak' not in out['stages']['outer']
+    assert profiler.to_chrome_trace()['traceEvents'][0]['args']=={}
@@ -0,0 +1,67 @@
+import io
+import numpy as np
+import pytest
+import matplotlib
+from matplotlib.colors import Normalize
+from imagesc.utils import raster
+
+
+def _data(seed=0):
+    X = np.random.RandomState(seed).randn(40, 30)
+    X[0, :3] = [np.nan, np.inf, -np.inf]
+    return X
+
+
+@pytest.mark.parametrize('cmap', ['coolwarm', 'viridis', matplotlib.colors.ListedColormap(['red', 'green', 'blue'])])
+@pytest.mark.parametrize('clim', [(None, None), (-1, 1), (0.5, 0.5)])
+def test_to_rgba_equals_matplotlib(cmap, clim):
+    X = _data()
+    colors = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap
+    # Normalize uses the range of the finite values, like to_rgba
+    finite = X[np.isfinite(X)]
+    vmin = finite.min() if clim[0] is None else clim[0]
+    vmax = finite.max() if clim[1] is None else clim[1]
+    expected = colors(Normalize(vmin, vmax)(X), bytes=True)
+    # Normalize maps NaN to zero when vmin equals vmax, whereas the bad color is kept like imshow
+    expected[np.isnan(X)] = colors(np.nan, bytes=True)
+    np.testing.assert_array_equal(raster.to_rgba(X, cmap=cmap, vmin=clim[0], vmax=clim[1]), expected)
+
+
+def test_to_rgba_image():
+    image = np.random.RandomState(0).rand(5, 6, 3)
+    rgba = raster.to_rgba(image)
+    assert rgba.shape==(5, 6, 4) and rgba.dtype==np.uint8
+    assert (rgba[:, :, 3]==255).all()
+    np.testing.assert_array_equal(rgba[:, :, :3], (image * 255 + 0.5).astype(np.uint8))
+
+
+def test_to_png_roundtrip(tmp_path):
+    from PIL import Image
+    rgba = raster.to_rgba(_data(), cmap='viridis')
+    filepath = str(tmp_path / 'sub' / 'heatmap.png')
+    png = raster.to_png(rgba, filepath=filepath)
+    with open(filepath, 'rb') as f:
+        assert f.read()==png
+    np.testing.assert_array_equal(np.asarray(Image.open(io.BytesIO(png))), rgba)
+
+
+def test_lut_cache_key_includes_extremes():
+    plain = raster.lut('viridis')
+    bad = raster.lut('viridis', bad='red')
+    extremes = raster.lut('viridis', bad='red', over='white', under='black')
+    N = plain.shape[0] - 3
+    np.testing.assert_array_equal(bad[:N + 2], plain[:N + 2])
+    assert tuple(bad[N + 2])==(255, 0, 0, 255) and tuple(plain[N + 2])!=(255, 0, 0, 255)
+    assert tuple(extremes[N])==(0, 0, 0, 255) and tuple(extremes[N + 1])==(255, 255, 255, 255)
+    # Equal arguments return the cached table and colormap
+    assert raster.lut('viridis', bad='red') is bad
+    assert raster.lut('viridis', bad=(1, 0, 0, 1)) is bad
+    assert raster.colormap('viridis', bad='red') is raster.colormap('viridis', bad='red')
+    assert raster.lut(raster.colormap('viridis', bad='red')) is bad
+    assert not bad.flags.writeable
+
+
+def test_lut_number_of_colors():
+    table = raster.lut('coolwarm', N=16)
+    assert table.shape==(19, 4)
+    np.testing.assert_array_equal(table[:16], matplotlib.colormaps['coolwarm'].resampled(16)(np.arange(16), bytes=True))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from imagesc.utils import reduce
+
+
+def _sparse(shape=(53, 71), density=0.1, seed=0):
+    X = sparse.random(*shape, density=density, format='csr', random_state=seed)
+    X.data = X.data - 0.5
+    X.data[::7] = np.nan
+    return X
+
+
+def _assert_stats(X, dense):
+    out = reduce.stats(X)
+    assert np.isclose(out['min'], np.nanmin(dense))
+    assert np.isclose(out['max'], np.nanmax(dense))
+    assert np.isclose(out['mean'], np.nanmean(dense))
+
+
+@pytest.mark.parametrize('fmt', ['csr', 'csc', 'coo'])
+def test_stats_sparse_equals_dense(fmt):
+    X = _sparse().asformat(fmt)
+    _assert_stats(X, X.toarray())
+
+
+def test_stats_sparse_duplicates():
+    X = sparse.coo_matrix(([0.5, 1.0, 1.5], ([0, 0, 0], [0, 0, 0])), shape=(2, 2))
+    _assert_stats(X, X.toarray())
+    assert np.isclose(reduce.stats(X)['mean'], 0.75)
+
+
+def test_stats_sparse_empty():
+    X = sparse.csr_matrix((3, 4))
+    assert reduce.stats(X)=={'min': 0.0, 'max': 0.0, 'mean': 0.0}
+
+
+@pytest.mark.parametrize('method', ['mean', 'max', 'min'])
+@pytest.mark.parametrize('block', [(2, 3), (5, 5), (53, 1)])
+def test_downsample_sparse_equals_dense(method, block):
+    X = _sparse()
+    expected = reduce.downsample(X.toarray(), block, method=method)
+    np.testing.assert_allclose(reduce.downsample(X, block, method=method), expected, equal_nan=True)
+
+
+def test_downsample_sparse_duplicates():
+    X = sparse.coo_matrix(([0.5, 1.0, 1.5], ([0, 0, 3], [0, 0, 1])), shape=(4, 4))
+    np.testing.assert_allclose(reduce.downsample(X, (2, 2)), reduce.downsample(X.toarray(), (2, 2)))
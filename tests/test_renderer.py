@@ -0,0 +1,92 @@
+import sys
+import pytest
+import numpy as np
+import imagesc
+
+
+def test_update_keeps_background():
+    renderer = imagesc.HeatmapRenderer((30, 40), show=False, verbose=0)
+    renderer.update(np.random.rand(30, 40))
+    background = renderer._background
+    renderer.update(np.random.rand(30, 40) * 2)
+    # The color range of the first frame is kept, so the background is not drawn again
+    assert renderer._background is background
+    assert renderer.image.get_clim()==renderer._clim
+    renderer.close()
+    assert len(renderer.fig.axes)==0
+
+
+def test_blit_equals_full_draw():
+    renderer = imagesc.HeatmapRenderer((10, 12), vmin=0, vmax=1, show=False, linewidth=0.8, linecolor='#ffffff', verbose=0)
+    renderer.update(np.random.rand(10, 12))
+    blit = np.array(renderer.buffer())
+    renderer._background = None
+    renderer.draw()
+    np.testing.assert_array_equal(blit, renderer.buffer())
+
+
+def test_animate_gif(tmp_path):
+    frames = (np.random.rand(20, 20) for i in range(5))
+    out = imagesc.animate(frames, out=str(tmp_path / 'heatmap.gif'), fps=5, verbose=0)
+    from PIL import Image
+    assert Image.open(out).n_frames==5
+
+
+def test_clim_first_skips_empty_frames():
+    renderer = imagesc.HeatmapRenderer((10, 10), show=False, verbose=0)
+    renderer.update(np.full((10, 10), np.nan))
+    vmin, vmax = renderer.image.get_clim()
+    assert vmin<vmax
+    assert renderer._clim is None
+    renderer.update(np.full((10, 10), 3.0))
+    assert renderer._clim==(2.5, 3.5)
+    renderer.update(np.arange(100.).reshape(10, 10))
+    assert renderer.image.get_clim()==(2.5, 3.5)
+    renderer.close()
+
+
+def test_clim_frame_redraws_background():
+    renderer = imagesc.HeatmapRenderer((10, 10), clim='frame', show=False, verbose=0)
+    renderer.update(np.random.rand(10, 10))
+    background = renderer._background
+    renderer.update(np.random.rand(10, 10) * 10)
+    assert renderer._background is not background
+    vmin, vmax = renderer.image.get_clim()
+    assert vmax>1
+    # The same range keeps the background
+    data = np.random.rand(10, 10)
+    data[0, 0], data[0, 1] = 0, 10
+    renderer.update(data)
+    background = renderer._background
+    renderer.update(data[::-1])
+    assert renderer._background is background
+    renderer.close()
+
+
+def _fake_ffmpeg(tmp_path, monkeypatch, script):
+    import matplotlib
+    from matplotlib.animation import FFMpegWriter
+    path = tmp_path / 'ffmpeg'
+    path.write_text('#!/bin/sh\n' + script + '\n')
+    path.chmod(0o755)
+    monkeypatch.setitem(matplotlib.rcParams, 'animation.ffmpeg_path', str(path))
+    monkeypatch.setattr(FFMpegWriter, 'isAvailable', classmethod(lambda cls: True))
+
+
+@pytest.mark.skipif(sys.platform=='win32', reason='shell script as ffmpeg')
+def test_animate_ffmpeg_keeps_frame_error(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, 'cat > /dev/null; echo failed >&2; exit 1')
+
+    def frames():
+        yield np.random.rand(20, 20)
+        raise KeyError('frame')
+    with pytest.raises(KeyError):
+        imagesc.animate(frames(), out=str(tmp_path / 'heatmap.mp4'), verbose=0)
+
+
+@pytest.mark.skipif(sys.platform=='win32', reason='shell script as ffmpeg')
+def test_animate_ffmpeg_error(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, 'echo invalid codec >&2; exit 1')
+    frames = (np.random.rand(200, 200) for i in range(50))
+    with pytest.raises(RuntimeError, match='invalid codec'):
+        imagesc.animate(frames, out=str(tmp_path / 'heatmap.mp4'), verbose=0)
@@ -0,0 +1,63 @@
+import os
+import re
+import numpy as np
+import pytest
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.collections import QuadMesh
+import imagesc
+from imagesc.utils.savefig import savefig, _heavy_artists
+
+
+def _heatmap(n=30):
+    sns = pytest.importorskip('seaborn')
+    fig, ax = plt.subplots(figsize=(5, 4))
+    sns.heatmap(np.random.RandomState(0).rand(n, n), ax=ax, xticklabels=['col%d' %(i) for i in range(n)], yticklabels=False)
+    ax.set_title('heatmap title')
+    return fig, ax
+
+
+def test_savefig_returns_size(tmp_path):
+    fig, ax = plt.subplots()
+    filepath = str(tmp_path / 'figs' / 'heatmap.png')
+    out = savefig(fig, filepath, verbose=0)
+    assert out=={'filepath': filepath, 'filesize': os.path.getsize(filepath)}
+    assert savefig(fig, '', verbose=0) is False
+    plt.close(fig)
+
+
+def test_heavy_artists_skip_colorbar():
+    fig, ax = _heatmap()
+    cbar_ax = [axes for axes in fig.axes if axes is not ax][0]
+    assert hasattr(cbar_ax, '_colorbar') and any(isinstance(c, QuadMesh) for c in cbar_ax.collections)
+    assert _heavy_artists(fig)==[c for c in ax.collections if isinstance(c, QuadMesh)]
+    plt.close(fig)
+
+
+@pytest.mark.parametrize('fmt', ['svg', 'pdf'])
+def test_vector_formats_rasterize_cells(tmp_path, fmt):
+    fig, ax = _heatmap()
+    states = [artist.get_rasterized() for axes in fig.axes for artist in axes.get_children()]
+    raster = savefig(fig, str(tmp_path / ('raster.' + fmt)), verbose=0)
+    vector = savefig(fig, str(tmp_path / ('vector.' + fmt)), rasterize=False, verbose=0)
+    assert raster['filesize']<vector['filesize']
+    # The rasterized state of the artists is restored
+    assert [artist.get_rasterized() for axes in fig.axes for artist in axes.get_children()]==states
+    plt.close(fig)
+
+
+def test_svg_keeps_text_and_colorbar(tmp_path):
+    fig, ax = _heatmap()
+    filepath = str(tmp_path / 'heatmap.svg')
+    with matplotlib.rc_context({'svg.fonttype': 'none'}):
+        savefig(fig, filepath, verbose=0)
+    with open(filepath, encoding='utf8') as f:
+        svg = f.read()
+    # The cells are an image instead of a path per cell. Matplotlib rasterizes the colorbar itself.
+    assert svg.count('<image')==2
+    assert len(re.findall(r'<path ', svg))<300
+    # The title, tick labels and colorbar ticks remain text
+    texts = re.findall(r'>([^<>]+)</text>', svg)
+    assert 'heatmap title' in texts and 'col0' in texts
+    assert any(re.fullmatch(r'0\.\d', text.strip()) for text in texts)
+    plt.close(fig)
@@ -0,0 +1,48 @@
+import numpy as np
+import imagesc
+from imagesc.utils import ticks
+
+
+def _labels(n):
+    return np.array(['label%04d' %(i) for i in range(n)])
+
+
+def test_thin_all_labels_fit():
+    np.testing.assert_array_equal(ticks.thin(_labels(10), length=1000, fontsize=10), np.arange(10))
+    assert len(ticks.thin([], length=100))==0
+
+
+def test_thin_every_nth_label():
+    labels = _labels(1000)
+    index = ticks.thin(labels, length=500, fontsize=10, rotation=90, axis='x')
+    # A rotated label takes the height of a line along the x-axis
+    capacity = int(500 // (ticks.LINE_HEIGHT * 10))
+    assert 0<len(index)<=capacity
+    assert len(np.unique(np.diff(index)))==1
+    # Horizontal labels take the width of the text
+    assert len(ticks.thin(labels, length=500, fontsize=10, rotation=0, axis='x'))<len(index)
+
+
+def test_thin_keeps_pinned_labels():
+    labels = _labels(1000)
+    pinned = ['label0333', 'label0500', 'label0999', 'unknown']
+    index = ticks.thin(labels, length=500, fontsize=10, rotation=90, pinned=pinned)
+    step = int(np.ceil(1000 / int(500 // (ticks.LINE_HEIGHT * 10))))
+    keep = [333, 500, 999]
+    assert set(keep)<=set(index)
+    assert list(index)==sorted(index)
+    # Other labels do not overlap with the pinned labels
+    for i in np.setdiff1d(index, keep):
+        assert np.abs(np.array(keep) - i).min()>=step
+    # Labels are compared as strings
+    assert 500 in ticks.thin(np.arange(1000), length=500, fontsize=10, rotation=90, pinned=[500])
+
+
+def test_fast_shows_pinned_labels():
+    X = np.random.rand(500, 20)
+    fig, ax = imagesc.fast(X, row_labels=_labels(500), pinned_labels=['label0123'], show=False, verbose=0)
+    shown = [label.get_text() for label in ax.get_yticklabels()]
+    assert 'label0123' in shown
+    assert 1<len(shown)<500
+    fig, ax = imagesc.fast(X, row_labels=_labels(500), label_thinning=False, show=False, verbose=0)
+    assert len(ax.get_yticklabels())==500
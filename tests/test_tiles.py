@@ -0,0 +1,56 @@
+import os
+import time
+import numpy as np
+import imagesc
+
+
+def _files(out_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), out_dir) for root, _, names in os.walk(out_dir) for name in names if name.endswith('.png'))
+
+
+def test_tiles_layout(tmp_path):
+    out_dir = str(tmp_path)
+    manifest = imagesc.tiles(np.random.rand(600, 900), out_dir, tile_size=256, verbose=0)
+    assert manifest['max_zoom']==2
+    assert _files(out_dir)==sorted(name + '.png' for name in manifest['hashes'])
+
+
+def test_tiles_unchanged_are_not_written(tmp_path):
+    out_dir = str(tmp_path)
+    X = np.random.rand(600, 900)
+    imagesc.tiles(X, out_dir, tile_size=256, vmin=0, vmax=1, verbose=0)
+    mtime = {name: os.stat(os.path.join(out_dir, name)).st_mtime_ns for name in _files(out_dir)}
+    time.sleep(0.05)
+    X[0, 0] = 0.5
+    imagesc.tiles(X, out_dir, tile_size=256, vmin=0, vmax=1, verbose=0)
+    changed = sorted(name for name in mtime if os.stat(os.path.join(out_dir, name)).st_mtime_ns!=mtime[name])
+    # Only the tiles that cover the first cell are written again
+    assert changed==[os.path.join(str(z), '0', '0.png') for z in range(3)]
+
+
+def test_tiles_removes_stale(tmp_path):
+    out_dir = str(tmp_path)
+    imagesc.tiles(np.random.rand(600, 900), out_dir, tile_size=256, verbose=0)
+    manifest = imagesc.tiles(np.random.rand(100, 100), out_dir, tile_size=256, verbose=0)
+    assert manifest['max_zoom']==0
+    assert _files(out_dir)==[os.path.join('0', '0', '0.png')]
+    assert sorted(os.listdir(out_dir))==['0', 'tiles.json']
+
+
+def test_tiles_custom_colormap(tmp_path):
+    from matplotlib.colors import ListedColormap
+    from PIL import Image
+    out_dir = str(tmp_path)
+    X = np.random.rand(300, 300)
+    X[0, 0] = np.nan
+    cmap = ListedColormap(['#ff0000', '#0000ff'], name='coolwarm')
+    imagesc.tiles(X, out_dir, tile_size=256, cmap=cmap, vmin=0, vmax=1, verbose=0)
+    pixels = np.asarray(Image.open(os.path.join(out_dir, '1', '0', '0.png')).convert('RGBA'))
+    assert set(map(tuple, pixels[1:, 1:].reshape(-1, 4)))=={(255, 0, 0, 255), (0, 0, 255, 255)}
+    mtime = {name: os.stat(os.path.join(out_dir, name)).st_mtime_ns for name in _files(out_dir)}
+    time.sleep(0.05)
+    # Another bad color changes the colors of all tiles, although the name of the colormap is the same
+    imagesc.tiles(X, out_dir, tile_size=256, cmap=cmap.with_extremes(bad='#00ff00'), vmin=0, vmax=1, verbose=0)
+    assert all(os.stat(os.path.join(out_dir, name)).st_mtime_ns!=mtime[name] for name in mtime)
+    pixels = np.asarray(Image.open(os.path.join(out_dir, '1', '0', '0.png')).convert('RGBA'))
+    assert tuple(pixels[0, 0])==(0, 255, 0, 255)